@@ -0,0 +1,164 @@
+"""Read replica routing.
+
+The routing middleware records, per request, whether its reads may go to the
+replica: safe-method requests may, writes never do. The router then sends
+those reads to REPLICA_DATABASE unless:
+
+- the request already wrote, or runs inside a transaction on the primary,
+- its session wrote less than READ_YOUR_WRITES_WINDOW seconds ago. The
+  session is the bearer token plus the X-Session-Key header: every browser
+  shares the front token, so the front sends the connected wallet (or a
+  per-tab id) there and one player's writes do not pin everyone. The
+  REPLICA_ANALYTICS_PATHS endpoints tolerate the lag and skip this check,
+- the replica lags more than REPLICA_MAX_LAG seconds behind, or is down.
+
+Without a REPLICA_DATABASE alias every query stays on the primary.
+"""
+import hashlib
+import logging
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_KEY = 'db:pin:{}'
+
+class Routing:
+    """Routing state of the current request."""
+    __slots__ = ('use_replica', 'wrote')
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+_routing = ContextVar('db_routing', default=None)
+
+# Per-worker cache of the replica lag check: (checked_at, healthy)
+_replica_health = (float('-inf'), False)
+
+def replica_alias():
+    alias = settings.REPLICA_DATABASE
+    return alias if alias in settings.DATABASES else None
+
+def replica_lag(alias):
+    """Seconds the replica is behind the primary (0 when fully replayed)."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        # An idle primary sends no new WAL: a caught-up replica is not lagging
+        cursor.execute(
+            "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+        )
+        return float(cursor.fetchone()[0])
+
+def replica_healthy(alias):
+    """Whether the replica is within REPLICA_MAX_LAG, rechecked every few seconds."""
+    global _replica_health
+    now = time.monotonic()
+    checked_at, healthy = _replica_health
+    if now - checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return healthy
+    try:
+        lag = replica_lag(alias)
+        healthy = lag <= settings.REPLICA_MAX_LAG
+        if not healthy:
+            logger.warning(f"Replica '{alias}' lags {lag:.1f}s behind, reading from the primary")
+    except Exception as e:
+        healthy = False
+        logger.error(f"Replica '{alias}' lag check failed, reading from the primary: {e}")
+    _replica_health = (now, healthy)
+    return healthy
+
+def session_key(request):
+    # Hashed: the pin key holds neither the token nor the wallet
+    credentials = request.headers.get('Authorization', '') + '|' + request.headers.get('X-Session-Key', '')
+    return PIN_KEY.format(hashlib.sha1(credentials.encode()).hexdigest())
+
+def is_pinned(request):
+    try:
+        return bool(cache.get(session_key(request)))
+    except Exception as e:
+        logger.error(f"Read-your-writes pin lookup failed: {e}")
+        return True
+
+def pin_to_primary(request):
+    try:
+        cache.set(session_key(request), 1, timeout=settings.READ_YOUR_WRITES_WINDOW)
+    except Exception as e:
+        logger.error(f"Read-your-writes pin failed: {e}")
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or not routing.use_replica or routing.wrote:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        alias = replica_alias()
+        if alias is None or not replica_healthy(alias):
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+class ReplicaRoutingMiddleware:
+    """Sets the routing state of each request and pins sessions that write."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def routing_for(self, request):
+        if replica_alias() is None:
+            return Routing(use_replica=False)
+        if request.method not in SAFE_METHODS or request.path.startswith(settings.REPLICA_PRIMARY_ONLY_PATHS):
+            return Routing(use_replica=False)
+        if request.path.startswith(settings.REPLICA_ANALYTICS_PATHS):
+            # Analytical reads tolerate the lag and skip read-your-writes
+            return Routing(use_replica=True)
+        return Routing(use_replica=not is_pinned(request))
+
+    def finish(self, request, routing):
+        if routing.wrote and replica_alias() is not None:
+            pin_to_primary(request)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = self.routing_for(request)
+        token = _routing.set(routing)
+        try:
+            return self.get_response(request)
+        finally:
+            _routing.reset(token)
+            self.finish(request, routing)
+
+    async def __acall__(self, request):
+        routing = self.routing_for(request)
+        token = _routing.set(routing)
+        try:
+            return await self.get_response(request)
+        finally:
+            _routing.reset(token)
+            self.finish(request, routing)
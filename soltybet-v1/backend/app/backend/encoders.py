@@ -0,0 +1,56 @@
+import decimal
+import ipaddress
+import datetime
+import orjson
+from django.db.models.query import QuerySet
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+
+# UUID, datetime, date and time are encoded natively by orjson; UTC datetimes
+# end with "Z" like DRF's encoder
+OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+def default(obj):
+    """Types orjson does not handle itself, encoded as DRF's JSONEncoder does."""
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, decimal.Decimal):
+        # Serializers already coerce decimals to strings
+        return float(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, (
+        ipaddress.IPv4Address,
+        ipaddress.IPv6Address,
+        ipaddress.IPv4Network,
+        ipaddress.IPv6Network,
+        ipaddress.IPv4Interface,
+        ipaddress.IPv6Interface)
+    ):
+        return str(obj)
+    if isinstance(obj, QuerySet):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if isinstance(obj, (tuple, set, frozenset)):
+        return list(obj)
+    if hasattr(obj, '__getitem__'):
+        try:
+            return dict(obj)
+        except Exception:
+            pass
+    if hasattr(obj, '__iter__'):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(data, option=0):
+    """Encode `data` to JSON bytes."""
+    return orjson.dumps(data, default=default, option=OPTIONS | option)
+
+def dumps_str(data):
+    """Encode `data` to a JSON string, for websocket text frames."""
+    return dumps(data).decode()
+
+loads = orjson.loads
@@ -3,6 +3,8 @@ from channels.middleware import BaseMiddleware
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.models import TokenUser
+from datalog.authentication import ROLE_CLAIM, check_revoked
 from django.contrib.auth.models import AnonymousUser
 from urllib.parse import parse_qs
 
@@ -13,8 +15,10 @@ def get_user_from_token(token):
     User = get_user_model()
     try:
         access_token = AccessToken(token)
+        check_revoked(access_token)
+        if ROLE_CLAIM in access_token:
+            return TokenUser(access_token)
         user_id = access_token['user_id']
-        username = access_token.get('username')
         user = User.objects.get(id=user_id)
         return user
     except Exception as e:
@@ -0,0 +1,19 @@
+import orjson
+from rest_framework.renderers import BaseRenderer
+from backend.encoders import dumps
+
+class ORJSONRenderer(BaseRenderer):
+    """Drop-in replacement for DRF's JSONRenderer, backed by orjson."""
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        option = 0
+        # Honour "Accept: application/json; indent=N" like JSONRenderer (orjson only indents by 2)
+        if accepted_media_type and 'indent=' in accepted_media_type:
+            option = orjson.OPT_INDENT_2
+        # Escaped like JSONRenderer does: older JavaScript rejects U+2028/U+2029 in strings
+        return dumps(data, option).replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
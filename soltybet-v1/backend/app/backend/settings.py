@@ -1,6 +1,7 @@
 from pathlib import Path
 import os
 import environ
+from corsheaders.defaults import default_headers
 from datetime import timedelta
 from backend.webhook_handler import WebhookHandler
 import json
@@ -34,6 +35,8 @@ INSTALLED_APPS = [
     'corsheaders',
     'daphne',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
+    'django_filters',
     'phase',
     'csp',
     'datalog',
@@ -41,6 +44,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'backend.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,6 +96,7 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
     'JTI_CLAIM': 'jti',
+    'TOKEN_OBTAIN_SERIALIZER': 'datalog.authentication.RoleTokenObtainPairSerializer',
 }
 
 ROOT_URLCONF = 'backend.urls'
@@ -124,9 +129,54 @@ DATABASES = {
         'PASSWORD': read_secret('db_pass'),
         'HOST': 'db',
         'PORT': '5432',
+        # One psycopg pool per worker process: connections are reused across
+        # requests instead of being opened (and authenticated) for each one
+        'OPTIONS': {
+            'pool': {
+                'name': 'default',
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '4')),
+                'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '20')),
+                # Seconds a request waits for a free connection before failing
+                'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '5')),
+                'max_idle': 300,
+                'max_lifetime': 1800,
+            },
+        },
+        # With a pool, checks each connection as it is checked out
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Optional streaming replica for read traffic, see backend/db_router.py
+REPLICA_DATABASE = 'replica'
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES[REPLICA_DATABASE] = {
+        **DATABASES['default'],
+        'HOST': os.environ['DB_REPLICA_HOST'],
+        'PORT': os.environ.get('DB_REPLICA_PORT', '5432'),
+        'OPTIONS': {'pool': {**DATABASES['default']['OPTIONS']['pool'], 'name': REPLICA_DATABASE}},
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['backend.db_router.ReplicaRouter']
+# Replica reads fall back to the primary beyond this lag (seconds), checked every interval
+REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', '5'))
+REPLICA_LAG_CHECK_INTERVAL = 5
+# A session that wrote reads from the primary for this long; keep it above REPLICA_MAX_LAG
+READ_YOUR_WRITES_WINDOW = 10
+# Read endpoints served from the replica even right after the session wrote
+REPLICA_ANALYTICS_PATHS = (
+    '/api/stats/',
+    '/api/matches/stats/',
+    '/api/fighters/stats/',
+    '/api/users/top_volume/',
+    '/api/users/top_gain/',
+    '/api/users/leaderboard/',
+)
+# Read endpoints that always need the primary (settlement inputs)
+REPLICA_PRIMARY_ONLY_PATHS = (
+    '/api/bets/bets_volume/',
+)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -162,17 +212,33 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CORS_ALLOWED_ORIGINS = ['http://scraper', 'http://proxy', 'http://backend:8000', 'http://frontend:3000', 'https://solty.bet', 'wss://solty.bet']
+# Paginated lists announce their next page in a Link header
+CORS_EXPOSE_HEADERS = ['Link']
+# The front sends its wallet as the read-your-writes session, see backend/db_router.py
+CORS_ALLOW_HEADERS = (*default_headers, 'x-session-key')
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'datalog.authentication.ServiceTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'backend.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'backend.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'ALLOWED_METHODS': ['GET', 'POST', 'PUT', 'DELETE'],
 }
 
+# Rows fetched per server-side cursor round trip when streaming NDJSON lists
+NDJSON_CHUNK_SIZE = 2000
+
 # Load Discord webhook URLs from the secret
 discord_secret = read_secret('discord')
 if discord_secret:
@@ -245,6 +311,25 @@ LOGGING = {
 
 ASGI_APPLICATION = 'backend.asgi.application'
 
+CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": "rediss://redis:6380/1",
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "CONNECTION_POOL_KWARGS": {
+                "ssl_cert_reqs": "required",
+                "ssl_certfile": "/run/secrets/certificate",
+                "ssl_keyfile": "/run/secrets/key",
+                "ssl_ca_certs": "/run/secrets/ca_certificate",
+            },
+        },
+    },
+}
+
+# Minimum interval, in seconds, between two live volume pushes for a match
+VOLUME_BROADCAST_INTERVAL = float(os.environ.get('VOLUME_BROADCAST_INTERVAL', '1'))
+
 CHANNELS_ALLOWED_ORIGINS = ['http://scraper', 'https://solty.bet', 'wss://solty.bet']
 CHANNEL_LAYERS = {
     "default": {
@@ -3,7 +3,7 @@ from django.urls import path, include
 from django.http import HttpResponse
 from phase.views import WSTokenView
 from rest_framework import routers
-from datalog import views
+from datalog import views, async_views
 from datalog.views import FighterViewSet, MatchViewSet, UserViewSet, BetViewSet
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -23,6 +23,14 @@ def health_check(request):
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # Async versions of the hot read actions, matched before the viewsets
+    path('api/matches/latest/', async_views.latest, name='match-latest'),
+    path('api/bets/get_volumes/', async_views.get_volumes, name='bet-get-volumes'),
+    path('api/bets/bet_history/', async_views.bet_history, name='bet-bet-history'),
+    path('api/users/expected_wins_data/', async_views.expected_wins_data, name='user-expected-wins-data'),
+    path('api/users/top_volume/', async_views.top_volume, name='user-top-volume'),
+    path('api/users/top_gain/', async_views.top_gain, name='user-top-gain'),
+    path('api/users/leaderboard/', async_views.leaderboard, name='user-leaderboard'),
     path('api/', include(router.urls)),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class DatalogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'datalog'
+
+    def ready(self):
+        from . import authentication  # noqa: F401 (revocation signal handlers)
@@ -0,0 +1,186 @@
+"""Native async versions of the hot read endpoints.
+
+DRF views are synchronous, so under ASGI every request runs through the
+thread-sensitive sync bridge and a worker serves its polls one at a time.
+These views keep the same URLs, permissions and payloads as the viewset
+actions they shadow (see backend/urls.py). In Django 5.2 the async ORM
+methods still run their queries on that same thread-sensitive executor;
+what overlaps is everything else (authentication, the read cache, Redis
+and the waits on a cold cache entry). `manage.py benchmark_async_views`
+measures both routes under concurrent polls.
+"""
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.db.models import Q, Sum
+from django.http import HttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAuthenticated
+from backend.encoders import dumps
+from datalog.authentication import ROLE_CLAIM, ServiceTokenAuthentication
+from datalog.caching import aread_through, match_key, match_volumes_key, CURRENT_MATCH_KEY
+from datalog.models import User, Match, Bet
+from datalog.permissions import IsFront, IsScrap
+from datalog.serializers import MATCH_VALUES, VOLUMES_VALUES, BET_HISTORY_VALUES
+from datalog.serializers import match_values, volumes_values, bet_history_values, to_sol
+from datalog import leaderboards
+
+_authentication = ServiceTokenAuthentication()
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+def unauthorized(request, detail):
+    response = json_response(detail if isinstance(detail, dict) else {'detail': detail}, status=401)
+    response['WWW-Authenticate'] = _authentication.authenticate_header(request)
+    return response
+
+async def authenticate(request):
+    """Sets request.user from the bearer token, like ServiceTokenAuthentication.
+
+    Tokens carrying the role claim are checked without I/O; only the legacy
+    ones need the database lookup, run off the event loop.
+    """
+    header = _authentication.get_header(request)
+    raw_token = _authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+    validated_token = _authentication.get_validated_token(raw_token)
+    if ROLE_CLAIM in validated_token:
+        return _authentication.get_user(validated_token)
+    return await sync_to_async(_authentication.get_user)(validated_token)
+
+def api_view(permission_class):
+    """GET-only async view guarded by one of the datalog role permissions.
+
+    The checks run in the order of APIView.dispatch: authentication, then
+    permission, then the method.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                request.user = await authenticate(request)
+            except AuthenticationFailed as e:
+                return unauthorized(request, e.detail)
+            if request.user is None:
+                return unauthorized(request, 'Authentication credentials were not provided.')
+            permission = permission_class()
+            if not permission.has_permission(request, None):
+                message = getattr(permission, 'message', None) or 'You do not have permission to perform this action.'
+                return json_response({'detail': message}, status=403)
+            if request.method != 'GET':
+                response = json_response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+                response['Allow'] = 'GET'
+                return response
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def leaderboard_limit(request):
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        limit = 10
+    return max(1, min(limit, leaderboards.LEADERBOARD_MAX_LIMIT))
+
+@api_view(IsFront)
+async def latest(request):
+    try:
+        m_id = await aread_through(
+            CURRENT_MATCH_KEY,
+            lambda: Match.objects.order_by('-creation_date').values_list('m_id', flat=True).afirst()
+        )
+
+        async def match_data():
+            row = await Match.objects.filter(m_id=m_id).values(*MATCH_VALUES).afirst()
+            return match_values(row) if row else None
+
+        data = m_id and await aread_through(match_key(m_id), match_data)
+        if not data:
+            return json_response({'error': 'Aucun match trouvé'}, status=404)
+        return json_response(data)
+    except Exception as e:
+        return json_response({'error': str(e)}, status=500)
+
+@api_view(IsScrap)
+async def get_volumes(request):
+    m_id = request.GET.get('m_id')
+    if not m_id:
+        return json_response({'error': 'm_id is required'}, status=400)
+
+    async def volumes_data():
+        row = await Match.objects.filter(m_id=m_id).values(*VOLUMES_VALUES).afirst()
+        return volumes_values(row) if row else None
+
+    data = await aread_through(match_volumes_key(m_id), volumes_data)
+    if data is None:
+        return json_response({'error': 'Match not found'}, status=404)
+    return json_response(data)
+
+@api_view(IsAuthenticated)
+async def expected_wins_data(request):
+    m_id = request.GET.get('m_id')
+    wallet = request.GET.get('wallet')
+    if not m_id or not wallet:
+        return json_response({'error': 'm_id and wallet are required'}, status=400)
+    # Both teams in one aggregate; the user is only looked up when nothing matched
+    totals = await Bet.objects.filter(m_id=m_id, u_id__wallet=wallet).aaggregate(
+        red=Sum('volume', filter=Q(team='red')),
+        blue=Sum('volume', filter=Q(team='blue')),
+    )
+    if totals['red'] is None and totals['blue'] is None and not await User.objects.filter(wallet=wallet).aexists():
+        return json_response({'error': 'User not found'}, status=404)
+    return json_response({
+        'userRedVolume': to_sol(totals['red']),
+        'userBlueVolume': to_sol(totals['blue'])
+    })
+
+@api_view(IsFront)
+async def bet_history(request):
+    wallet = request.GET.get('wallet')
+    if not wallet:
+        return json_response({'error': 'wallet is required'}, status=400)
+
+    try:
+        bets = Bet.objects.filter(
+            u_id__wallet=wallet,
+            success_in=True
+        ).order_by('-creation_date').values(*BET_HISTORY_VALUES)[:10]
+        data = [bet_history_values(bet) async for bet in bets]
+
+        # Le 404 n'est vérifié que lorsqu'il n'y a aucun pari
+        if not data and not await User.objects.filter(wallet=wallet).aexists():
+            return json_response({'error': 'User not found'}, status=404)
+        return json_response(data)
+    except Exception as e:
+        return json_response({'error': str(e)}, status=500)
+
+@api_view(IsFront)
+async def top_volume(request):
+    return json_response(await leaderboards.atop_volume(leaderboard_limit(request)))
+
+@api_view(IsFront)
+async def top_gain(request):
+    window = request.GET.get('window', 'all')
+    if window not in leaderboards.LEADERBOARD_WINDOWS:
+        return json_response({'error': f"window must be one of {', '.join(leaderboards.LEADERBOARD_WINDOWS)}"}, status=400)
+    return json_response(await leaderboards.atop_gain(leaderboard_limit(request), window))
+
+@api_view(IsFront)
+async def leaderboard(request):
+    board = request.GET.get('board', 'pnl')
+    if board not in leaderboards.RANKED_BOARDS:
+        return json_response({'error': f"board must be one of {', '.join(leaderboards.RANKED_BOARDS)}"}, status=400)
+    limit = leaderboard_limit(request)
+    try:
+        around = max(0, min(int(request.GET.get('around', 2)), 10))
+    except ValueError:
+        around = 2
+    try:
+        # Several Redis round trips: run them on a pool thread rather than the event loop
+        data = await sync_to_async(leaderboards.ranked, thread_sensitive=False)(
+            board, limit, request.GET.get('wallet'), around
+        )
+        return json_response(data)
+    except Exception as e:
+        return json_response({'error': str(e)}, status=503)
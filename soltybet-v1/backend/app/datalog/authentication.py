@@ -0,0 +1,86 @@
+import logging
+import time
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+ROLE_CLAIM = 'role'
+REVOKED_KEY = 'auth:revoked:{}'
+# Seconds a worker trusts its local copy of a revocation
+REVOCATION_CACHE_TTL = 5
+
+# {user_id: (expires, revoked_at)}, one entry per service account seen
+_revoked = {}
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Embeds the service account role in the tokens, so requests can be
+    authorized without loading the user."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[ROLE_CLAIM] = user.username.strip()
+        token['username'] = user.username
+        return token
+
+def revoked_at(user_id):
+    """Timestamp `user_id` was revoked at (None if never), refreshed from the
+    shared cache every few seconds."""
+    user_id = str(user_id)
+    now = time.monotonic()
+    expires, revoked = _revoked.get(user_id, (0.0, None))
+    if now >= expires:
+        revoked = cache.get(REVOKED_KEY.format(user_id))
+        _revoked[user_id] = (now + REVOCATION_CACHE_TTL, revoked)
+    return revoked
+
+def revoke_user(user_id):
+    """Reject every token issued to `user_id` up to now."""
+    # One key per user: concurrent revocations never overwrite each other,
+    # and the key expires with the last token it can reject
+    lifetime = int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+    cache.set(REVOKED_KEY.format(user_id), int(time.time()), timeout=lifetime)
+    _revoked.pop(str(user_id), None)
+
+def check_revoked(validated_token):
+    revoked = revoked_at(validated_token.get(api_settings.USER_ID_CLAIM))
+    if revoked is not None and validated_token.get('iat', 0) <= revoked:
+        raise AuthenticationFailed("Token has been revoked", code='token_revoked')
+
+class ServiceTokenAuthentication(JWTStatelessUserAuthentication):
+    """Trusts the role claim of the access token instead of loading auth.User.
+
+    Tokens issued before the role claim existed fall back to the database
+    lookup until they expire.
+    """
+
+    def get_user(self, validated_token):
+        check_revoked(validated_token)
+        if ROLE_CLAIM in validated_token:
+            return super().get_user(validated_token)
+        user = JWTAuthentication.get_user(self, validated_token)
+        user.role = user.username.strip()
+        return user
+
+@receiver(post_delete, sender=get_user_model())
+def revoke_deleted_user(sender, instance, **kwargs):
+    try:
+        revoke_user(instance.pk)
+    except Exception as e:
+        # The account is gone either way; its tokens expire on their own
+        logger.error(f"Revoking the tokens of deleted user {instance.pk} failed: {e}")
+
+@receiver(post_save, sender=get_user_model())
+def revoke_deactivated_user(sender, instance, created, **kwargs):
+    if not created and not instance.is_active:
+        try:
+            revoke_user(instance.pk)
+        except Exception as e:
+            logger.error(f"Revoking the tokens of deactivated user {instance.pk} failed: {e}")
@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import json
+import time
+from asgiref.sync import sync_to_async
+from collections import Counter
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Q, Sum
+from datalog.models import Match, Fighter, Bet
+from datalog.serializers import FighterSerializer, to_sol
+
+STATS_SNAPSHOT_KEY = 'stats_snapshot'
+# Safety net only: payouts and totals recomputes invalidate explicitly
+USER_STATS_TTL = 60 * 60
+
+# Hot match reads: fresh for READ_CACHE_TTL seconds, then served stale while
+# a single request (holding the lock) recomputes them. On a cold miss the
+# async views poll until that value is stored; the sync views, which share
+# one thread under ASGI, never wait and compute it themselves.
+READ_CACHE_TTL = 0.5
+READ_CACHE_STALE_TTL = 30
+READ_CACHE_LOCK_TTL = 2
+READ_CACHE_POLL_INTERVAL = 0.05
+CURRENT_MATCH_KEY = 'match:current'
+
+# Per-worker read cache counters: fresh hits, stale hits, recomputes
+read_cache_stats = Counter()
+
+def refresh_stats_snapshot():
+    """Rebuild the stats bot snapshot; called when a match settles."""
+    top_fighter = Fighter.objects.order_by('-elo').first()
+    bottom_fighter = Fighter.objects.order_by('elo').first()
+    data = {
+        "num_matches": Match.objects.count(),
+        "num_fighters": Fighter.objects.count(),
+        "top_fighter": dict(FighterSerializer(top_fighter).data) if top_fighter else {},
+        "bottom_fighter": dict(FighterSerializer(bottom_fighter).data) if bottom_fighter else {},
+    }
+    digest = hashlib.sha1(json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest()
+    snapshot = {"data": data, "etag": f'"{digest}"'}
+    cache.set(STATS_SNAPSHOT_KEY, snapshot, timeout=None)
+    return snapshot
+
+def get_stats_snapshot():
+    return cache.get(STATS_SNAPSHOT_KEY) or refresh_stats_snapshot()
+
+def user_stats_key(u_id):
+    return f'user_stats:{str(u_id).lower()}'
+
+def compute_user_stats(user):
+    """Profile stats of `user`, aggregated over their bets in one query."""
+    valid = Q(invalid_match=False, success_in=True)
+    totals = Bet.objects.filter(u_id=user).aggregate(
+        volume=Sum('volume', filter=valid),
+        gain=Sum('payout', filter=Q(invalid_match=False, success_out=True)),
+        nb_bets=Count('b_id', filter=valid),
+        winning_bets=Count('b_id', filter=valid & Q(payout__gt=0)),
+    )
+    total_bets = totals['nb_bets']
+    winning_bets = totals['winning_bets']
+    win_percentage = (winning_bets / total_bets * 100) if total_bets > 0 else 0
+    return {
+        'volume': to_sol(totals['volume']),
+        'total_volume': to_sol(user.total_volume),
+        'gain': to_sol(totals['gain']),
+        'nbBets': total_bets,
+        'winningBets': winning_bets,
+        'winPercentage': round(win_percentage, 2),
+        'referral_gain': to_sol(user.referral_gain)
+    }
+
+def get_user_stats(u_id, load_user):
+    """Cached profile stats; `load_user` is only called on a miss."""
+    key = user_stats_key(u_id)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_user_stats(load_user())
+        cache.set(key, stats, timeout=USER_STATS_TTL)
+    return stats
+
+def invalidate_user_stats(u_ids):
+    keys = [user_stats_key(u_id) for u_id in u_ids]
+    if keys:
+        cache.delete_many(keys)
+
+def match_key(m_id):
+    return f'match:{str(m_id).lower()}'
+
+def match_volumes_key(m_id):
+    return f'match_volumes:{str(m_id).lower()}'
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+def _read(key):
+    """Cache side of a read-through: (found, value, locked).
+
+    Entries are stored as (fresh_until, value) and outlive their TTL, so
+    while one request holds the recompute lock the others keep serving the
+    previous value instead of stampeding the database. Without a previous
+    value `found` is False: `locked` tells whether the caller got the lock
+    or another request is already computing the value.
+    """
+    entry = cache.get(key)
+    if entry is not None and entry[0] > time.time():
+        read_cache_stats['hits'] += 1
+        return True, entry[1], False
+    if cache.add(_lock_key(key), 1, timeout=READ_CACHE_LOCK_TTL):
+        read_cache_stats['misses'] += 1
+        return False, None, True
+    if entry is not None:
+        read_cache_stats['stale'] += 1
+        return True, entry[1], False
+    return False, None, False
+
+def _write(key, value, ttl):
+    cache.set(key, (time.time() + ttl, value), timeout=READ_CACHE_STALE_TTL)
+
+def _unlock(key):
+    cache.delete(_lock_key(key))
+
+def read_through(key, compute, ttl=READ_CACHE_TTL):
+    """Value of `key`, recomputed by `compute` once it is older than `ttl`.
+
+    Never waits: a cold miss while another request holds the lock is
+    computed here too, sleeping would hold up the other sync views.
+    """
+    found, value, locked = _read(key)
+    if found:
+        return value
+    if not locked:
+        read_cache_stats['misses'] += 1
+    try:
+        value = compute()
+        _write(key, value, ttl)
+    finally:
+        if locked:
+            _unlock(key)
+    return value
+
+async def aread_through(key, compute, ttl=READ_CACHE_TTL):
+    """read_through for the async views, `compute` being a coroutine function.
+
+    A cold miss waits on the event loop for the lock holder's value, up to
+    READ_CACHE_LOCK_TTL. The cache calls run in the thread pool rather than
+    on the thread-sensitive executor cache.aget uses, which would queue them
+    behind the ORM calls.
+    """
+    read = sync_to_async(_read, thread_sensitive=False)
+    deadline = time.monotonic() + READ_CACHE_LOCK_TTL
+    found, value, locked = await read(key)
+    while not found and not locked and time.monotonic() < deadline:
+        await asyncio.sleep(READ_CACHE_POLL_INTERVAL)
+        found, value, locked = await read(key)
+    if found:
+        return value
+    if not locked:
+        read_cache_stats['misses'] += 1
+    try:
+        value = await compute()
+        await sync_to_async(_write, thread_sensitive=False)(key, value, ttl)
+    finally:
+        if locked:
+            await sync_to_async(_unlock, thread_sensitive=False)(key)
+    return value
+
+def invalidate(*keys):
+    """Expire `keys` now: the next read recomputes them under the lock."""
+    cache.delete_many(keys)
+
+def invalidate_match(m_id):
+    invalidate(match_key(m_id), match_volumes_key(m_id))
+
+def read_cache_metrics():
+    served = sum(read_cache_stats.values())
+    return {
+        'hits': read_cache_stats['hits'],
+        'stale': read_cache_stats['stale'],
+        'misses': read_cache_stats['misses'],
+        'hit_rate': round((read_cache_stats['hits'] + read_cache_stats['stale']) / served, 4) if served else None,
+    }
@@ -0,0 +1,68 @@
+from django.core.exceptions import ValidationError
+from django.db import models
+
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+BASE58_INDEX = {char: index for index, char in enumerate(BASE58_ALPHABET)}
+SIGNATURE_LENGTH = 64
+
+def b58encode(data):
+    number = int.from_bytes(data, 'big')
+    encoded = ''
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded = BASE58_ALPHABET[remainder] + encoded
+    # Every leading zero byte is written as a leading '1'
+    return '1' * (len(data) - len(data.lstrip(b'\0'))) + encoded
+
+def b58decode(text):
+    number = 0
+    for char in text:
+        if char not in BASE58_INDEX:
+            raise ValueError(f"Invalid base58 character {char!r}")
+        number = number * 58 + BASE58_INDEX[char]
+    decoded = number.to_bytes((number.bit_length() + 7) // 8, 'big')
+    return b'\0' * (len(text) - len(text.lstrip('1'))) + decoded
+
+def signature_bytes(value):
+    """Raw bytes of a base58 signature; the empty string (no transaction yet)
+    gives empty bytes. Raises ValidationError for anything else."""
+    if not value:
+        return b''
+    try:
+        decoded = b58decode(value)
+    except (ValueError, TypeError) as e:
+        raise ValidationError(f"Invalid transaction signature: {e}", code='invalid')
+    if len(decoded) != SIGNATURE_LENGTH:
+        raise ValidationError(
+            f"A transaction signature is {SIGNATURE_LENGTH} bytes, got {len(decoded)}", code='invalid'
+        )
+    return decoded
+
+def validate_signature(value):
+    signature_bytes(value)
+
+class SignatureField(models.CharField):
+    """Transaction signature: base58 text in Python and the API, raw bytes in
+    a bytea column. The empty string (no transaction yet) is stored as an
+    empty bytea, so it stays distinct from NULL."""
+    description = "Base58 transaction signature stored as bytea"
+    default_validators = [validate_signature]
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_length', 88)
+        super().__init__(*args, **kwargs)
+
+    def db_type(self, connection):
+        return 'bytea'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return b58encode(bytes(value))
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is None:
+            return value
+        # Checked here too: bulk_update and save() skip the field validators
+        return connection.Database.Binary(signature_bytes(value))
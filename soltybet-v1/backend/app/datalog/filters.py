@@ -0,0 +1,61 @@
+import django_filters
+from datalog.models import User, Match, Bet, Fighter, Global
+
+# Every filterable field is an equality/membership or range match on an
+# indexed column; substring search is opt-in per field and backed by a
+# dedicated index (the varchar_pattern_ops *_like index Django adds to the
+# unique wallet and ref_code columns for prefixes, pg_trgm for fuzzy).
+KEY = ['exact', 'in']
+RANGE = ['exact', 'in', 'gte', 'lte']
+PREFIX = KEY + ['startswith']
+
+class UserFilter(django_filters.FilterSet):
+    class Meta:
+        model = User
+        fields = {
+            'u_id': KEY,
+            'wallet': PREFIX,
+            'ref_id': KEY,
+            'ref_code': PREFIX,
+            'creation_date': RANGE,
+        }
+
+class FighterFilter(django_filters.FilterSet):
+    search = django_filters.CharFilter(field_name='name', lookup_expr='trigram_similar')
+
+    class Meta:
+        model = Fighter
+        fields = {
+            'f_id': KEY,
+            'name': KEY,
+        }
+
+class MatchFilter(django_filters.FilterSet):
+    class Meta:
+        model = Match
+        fields = {
+            'm_id': KEY,
+            'red_id': KEY,
+            'blue_id': KEY,
+            'winner': KEY,
+            'creation_date': RANGE,
+        }
+
+class BetFilter(django_filters.FilterSet):
+    class Meta:
+        model = Bet
+        fields = {
+            'b_id': KEY,
+            'm_id': KEY,
+            'u_id': KEY,
+            'f_id': KEY,
+            'creation_date': RANGE,
+        }
+
+class GlobalFilter(django_filters.FilterSet):
+    class Meta:
+        model = Global
+        fields = {
+            'g_id': KEY,
+            'day': RANGE,
+        }
@@ -0,0 +1,312 @@
+import logging
+import threading
+from asgiref.sync import sync_to_async
+from datetime import timedelta
+from itertools import islice
+from django.core.cache import cache
+from django.db import connection
+from django_redis import get_redis_connection
+from redis.exceptions import WatchError
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from datalog.models import User, Bet
+from backend.encoders import dumps, loads
+from datalog.serializers import to_sol
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_TTL = 30
+# Delay before a failed ranked board update triggers a full rebuild; the
+# failures of that window share a single rebuild
+LEADERBOARD_REBUILD_DELAY = 30
+LEADERBOARD_MAX_LIMIT = 100
+LEADERBOARD_WINDOWS = {
+    'all': None,
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+}
+
+def _cached(key, compute):
+    data = cache.get(key)
+    if data is None:
+        data = compute()
+        cache.set(key, data, timeout=LEADERBOARD_TTL)
+    return data
+
+async def _acached(key, compute):
+    # Same as _cached for the async views; `compute` is a coroutine function
+    data = await sync_to_async(cache.get, thread_sensitive=False)(key)
+    if data is None:
+        data = await compute()
+        await sync_to_async(cache.set, thread_sensitive=False)(key, data, timeout=LEADERBOARD_TTL)
+    return data
+
+def _top_volume_rows(limit):
+    return User.objects.filter(total_volume__gt=0).order_by('-total_volume').values('wallet', 'total_volume')[:limit]
+
+def _volume_entries(users):
+    return [{
+        'wallet': user['wallet'],
+        'volume': to_sol(user['total_volume'])
+    } for user in users]
+
+def _top_gain_rows(limit, window):
+    """Best PnL (gain - volume), ordered by Postgres over the pnl index or,
+    for a time window, over the bets placed in that window."""
+    period = LEADERBOARD_WINDOWS[window]
+    if period is None:
+        return User.objects.order_by('-pnl').values(
+            'wallet', volume=F('total_volume'), gain=F('total_gain'), profit=F('pnl')
+        )[:limit]
+    return Bet.objects.filter(
+        creation_date__gte=timezone.now() - period,
+        invalid_match=False,
+        success_in=True
+    ).values(wallet=F('u_id__wallet')).annotate(
+        volume=Sum('volume'),
+        gain=Coalesce(Sum('payout', filter=Q(success_out=True)), 0),
+    ).annotate(
+        profit=F('gain') - F('volume')
+    ).order_by('-profit')[:limit]
+
+def _gain_entries(rows):
+    return [{
+        'wallet': row['wallet'],
+        'volume': to_sol(row['volume']),
+        'gain': to_sol(row['gain']),
+        'pnl': to_sol(row['profit'])
+    } for row in rows]
+
+def top_volume(limit=10):
+    return _cached(f'leaderboard:volume:{limit}', lambda: _volume_entries(_top_volume_rows(limit)))
+
+def top_gain(limit=10, window='all'):
+    return _cached(f'leaderboard:gain:{window}:{limit}', lambda: _gain_entries(_top_gain_rows(limit, window)))
+
+async def atop_volume(limit=10):
+    async def compute():
+        return _volume_entries([row async for row in _top_volume_rows(limit)])
+    return await _acached(f'leaderboard:volume:{limit}', compute)
+
+async def atop_gain(limit=10, window='all'):
+    async def compute():
+        return _gain_entries([row async for row in _top_gain_rows(limit, window)])
+    return await _acached(f'leaderboard:gain:{window}:{limit}', compute)
+
+# Ranked boards kept in Redis sorted sets (member: wallet, score: lamports),
+# so any wallet's rank and neighbours are O(log n) lookups.
+RANKED_BOARDS = {
+    'volume': 'total_volume',
+    'gain': 'total_gain',
+    'pnl': 'pnl',
+    'referral_gain': 'referral_gain',
+}
+
+# While a rebuild reloads the boards, updates are queued instead of applied
+# (the boards they target are about to be replaced) and replayed on the new
+# boards in the same transaction that swaps them in.
+REBUILD_LOCK_KEY = 'leaderboard:ranked:rebuilding'
+PENDING_KEY = 'leaderboard:ranked:pending'
+# Refreshed after every chunk: only a rebuild that died lets it expire
+REBUILD_LOCK_TTL = 300
+
+def _board_key(board):
+    return f'leaderboard:ranked:{board}'
+
+def _redis():
+    return get_redis_connection('default')
+
+def _score(amount):
+    # Redis scores are doubles: lamport integers are exact up to 2**53
+    return int(amount)
+
+def _apply(pipeline, updates):
+    for op, board, wallet, score in updates:
+        if op == 'incr':
+            pipeline.zincrby(_board_key(board), score, wallet)
+        else:
+            pipeline.zadd(_board_key(board), {wallet: score})
+
+def _send(updates):
+    """Apply [(op, board, wallet, score)] to the live boards, or queue them
+    for the running rebuild. WATCH on the rebuild lock makes the check and
+    the write atomic: a rebuild starting or ending in between retries it."""
+    if not updates:
+        return
+    with _redis().pipeline() as pipeline:
+        while True:
+            try:
+                pipeline.watch(REBUILD_LOCK_KEY)
+                rebuilding = pipeline.exists(REBUILD_LOCK_KEY)
+                pipeline.multi()
+                if rebuilding:
+                    pipeline.rpush(PENDING_KEY, dumps(updates))
+                else:
+                    _apply(pipeline, updates)
+                pipeline.execute()
+                return
+            except WatchError:
+                continue
+
+def increment_scores(deltas):
+    """Apply {wallet: {board: amount}} increments to the ranked boards.
+
+    Postgres stays the source of truth: a failed update is logged and
+    schedules a rebuild of the boards from it.
+    """
+    try:
+        _send([
+            ('incr', board, wallet, _score(amount))
+            for wallet, amounts in deltas.items()
+            for board, amount in amounts.items()
+            if amount
+        ])
+    except Exception as e:
+        logger.error(f"Ranked leaderboard increment failed, scheduling a rebuild: {e}")
+        schedule_rebuild()
+
+def set_scores(scores):
+    """Overwrite ranked scores with {wallet: {board: amount}}."""
+    try:
+        _send([
+            ('set', board, wallet, _score(amount))
+            for wallet, amounts in scores.items()
+            for board, amount in amounts.items()
+        ])
+    except Exception as e:
+        logger.error(f"Ranked leaderboard update failed, scheduling a rebuild: {e}")
+        schedule_rebuild()
+
+_rebuild_lock = threading.Lock()
+_rebuild_timer = None
+
+def schedule_rebuild(delay=LEADERBOARD_REBUILD_DELAY):
+    """Rebuild the ranked boards on a background thread in `delay` seconds,
+    unless a rebuild is already scheduled."""
+    global _rebuild_timer
+    with _rebuild_lock:
+        if _rebuild_timer is not None:
+            return
+        _rebuild_timer = timer = threading.Timer(delay, _scheduled_rebuild)
+        timer.daemon = True
+    timer.start()
+
+def _scheduled_rebuild():
+    global _rebuild_timer
+    with _rebuild_lock:
+        _rebuild_timer = None
+    try:
+        count = rebuild_ranked_boards()
+        if count is not None:
+            logger.info(f"Ranked leaderboards rebuilt: {count} user(s)")
+    except Exception as e:
+        # Redis is most likely still down: try again later
+        logger.error(f"Ranked leaderboard rebuild failed: {e}")
+        schedule_rebuild()
+    finally:
+        connection.close()
+
+def _start_rebuild(redis):
+    """Take the rebuild lock; False if another rebuild holds it. Updates left
+    queued by a rebuild that died are dropped: Postgres has them."""
+    with redis.pipeline() as pipeline:
+        try:
+            pipeline.watch(REBUILD_LOCK_KEY)
+            if pipeline.exists(REBUILD_LOCK_KEY):
+                return False
+            pipeline.multi()
+            pipeline.set(REBUILD_LOCK_KEY, 1, ex=REBUILD_LOCK_TTL)
+            pipeline.delete(PENDING_KEY)
+            pipeline.execute()
+            return True
+        except WatchError:
+            return False
+
+def _finish_rebuild(redis, staging, swap):
+    """Swap the staged boards in (or drop them), replay the queued updates on
+    the live boards and release the lock, all in one transaction."""
+    with redis.pipeline() as pipeline:
+        while True:
+            try:
+                pipeline.watch(PENDING_KEY)
+                pending = pipeline.lrange(PENDING_KEY, 0, -1)
+                pipeline.multi()
+                for board, key in staging.items():
+                    if swap:
+                        pipeline.rename(key, _board_key(board))
+                    else:
+                        pipeline.delete(key)
+                for updates in pending:
+                    _apply(pipeline, loads(updates))
+                pipeline.delete(PENDING_KEY, REBUILD_LOCK_KEY)
+                pipeline.execute()
+                return
+            except WatchError:
+                continue
+
+def rebuild_ranked_boards(chunk_size=5000):
+    """Reload every ranked board from Postgres, then swap them in atomically.
+
+    Returns the number of users loaded, or None when another rebuild is
+    already running.
+    """
+    redis = _redis()
+    staging = {board: f'{_board_key(board)}:rebuild' for board in RANKED_BOARDS}
+    if not _start_rebuild(redis):
+        logger.info("A ranked leaderboard rebuild is already running")
+        return None
+    count = 0
+    try:
+        redis.delete(*staging.values())
+        # Read after taking the lock: the updates committed later are queued
+        rows = User.objects.values_list('wallet', *RANKED_BOARDS.values()).iterator(chunk_size=chunk_size)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            pipeline = redis.pipeline(transaction=False)
+            for index, board in enumerate(RANKED_BOARDS, start=1):
+                pipeline.zadd(staging[board], {row[0]: row[index] for row in chunk})
+            pipeline.expire(REBUILD_LOCK_KEY, REBUILD_LOCK_TTL)
+            pipeline.execute()
+            count += len(chunk)
+    except Exception:
+        # Keep the current boards and still apply what was queued meanwhile
+        _finish_rebuild(redis, staging, swap=False)
+        raise
+    if count:
+        _finish_rebuild(redis, staging, swap=True)
+    else:
+        # No user: every board is emptied
+        _finish_rebuild(redis, {board: _board_key(board) for board in RANKED_BOARDS}, swap=False)
+    return count
+
+def _entries(rows, first_rank):
+    return [{
+        'rank': first_rank + offset,
+        'wallet': wallet.decode(),
+        'score': to_sol(score)
+    } for offset, (wallet, score) in enumerate(rows)]
+
+def ranked(board, limit=10, wallet=None, around=2):
+    """Top `limit` of a ranked board, plus `wallet`'s rank and neighbours."""
+    redis = _redis()
+    key = _board_key(board)
+    data = {
+        'board': board,
+        'top': _entries(redis.zrevrange(key, 0, limit - 1, withscores=True), 1),
+    }
+    if wallet:
+        rank = redis.zrevrank(key, wallet)
+        if rank is None:
+            data['position'] = None
+        else:
+            start = max(0, rank - around)
+            data['position'] = {
+                'wallet': wallet,
+                'rank': rank + 1,
+                'score': to_sol(redis.zscore(key, wallet)),
+                'neighbours': _entries(redis.zrevrange(key, start, rank + around, withscores=True), start + 1),
+            }
+    return data
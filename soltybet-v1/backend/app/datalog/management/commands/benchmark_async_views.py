@@ -0,0 +1,98 @@
+import asyncio
+import statistics
+import time
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from datalog import async_views
+from datalog.authentication import RoleTokenObtainPairSerializer
+from datalog.caching import CURRENT_MATCH_KEY, invalidate, invalidate_match
+from datalog.models import Match, User
+from datalog.views import BetViewSet, MatchViewSet, UserViewSet
+
+# endpoint: (service account, viewset, async view, query parameters)
+ENDPOINTS = {
+    'latest': ('front', MatchViewSet, async_views.latest, lambda m_id, wallet: {}),
+    'get_volumes': ('scrap', BetViewSet, async_views.get_volumes, lambda m_id, wallet: {'m_id': m_id}),
+    'expected_wins_data': ('front', UserViewSet, async_views.expected_wins_data,
+                           lambda m_id, wallet: {'m_id': m_id, 'wallet': wallet}),
+    'bet_history': ('front', BetViewSet, async_views.bet_history, lambda m_id, wallet: {'wallet': wallet}),
+    'top_volume': ('front', UserViewSet, async_views.top_volume, lambda m_id, wallet: {}),
+    'top_gain': ('front', UserViewSet, async_views.top_gain, lambda m_id, wallet: {'window': '24h'}),
+}
+
+def percentile(latencies, fraction):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+class Command(BaseCommand):
+    help = "Compare the latency of concurrent polls on the async views and the viewset actions they shadow"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=ENDPOINTS, action='append',
+                            help="Endpoint to poll (repeatable, default: all)")
+        parser.add_argument('--concurrency', type=int, default=100,
+                            help="Polls in flight at once, as during a betting rush")
+        parser.add_argument('--rounds', type=int, default=5,
+                            help="Bursts of --concurrency polls per endpoint and route")
+        parser.add_argument('--cold', action='store_true',
+                            help="Invalidate the match read cache before each burst, as confirm_bet does")
+
+    def handle(self, *args, **options):
+        concurrency, rounds = options['concurrency'], options['rounds']
+        if concurrency <= 0 or rounds <= 0:
+            raise CommandError("--concurrency and --rounds must be positive")
+        match = Match.objects.order_by('-creation_date').first()
+        user = User.objects.order_by('-total_volume').first()
+        if match is None or user is None:
+            raise CommandError("The benchmark polls existing data: no match or no user found")
+        self.m_id, self.cold = str(match.m_id), options['cold']
+
+        self.stdout.write(f"{rounds} burst(s) of {concurrency} concurrent poll(s) per route")
+        for name in options['endpoint'] or ENDPOINTS:
+            role, viewset, async_view, params = ENDPOINTS[name]
+            headers = {'HTTP_AUTHORIZATION': f'Bearer {self.token(role)}'}
+            request = lambda: RequestFactory().get('/', params(self.m_id, user.wallet), **headers)
+            action = getattr(viewset, name)
+            sync_view = viewset.as_view({'get': name}, **action.kwargs)
+            # The sync action runs as under ASGI: on the one thread-sensitive executor
+            routes = {
+                'sync': lambda: sync_to_async(lambda: sync_view(request()).render())(),
+                'async': lambda: async_view(request()),
+            }
+            for route, call in routes.items():
+                latencies, errors, elapsed = async_to_sync(self.run)(call, concurrency, rounds)
+                self.report(name, route, latencies, errors, elapsed)
+
+    def token(self, role):
+        account = get_user_model().objects.filter(username=role).first()
+        if account is None:
+            raise CommandError(f"No '{role}' service account to authenticate the polls")
+        return RoleTokenObtainPairSerializer.get_token(account).access_token
+
+    async def run(self, call, concurrency, rounds):
+        async def poll():
+            began = time.perf_counter()
+            response = await call()
+            return time.perf_counter() - began, response.status_code
+
+        latencies, errors, elapsed = [], 0, 0.0
+        for _ in range(rounds):
+            if self.cold:
+                await sync_to_async(invalidate)(CURRENT_MATCH_KEY)
+                await sync_to_async(invalidate_match)(self.m_id)
+            began = time.perf_counter()
+            results = await asyncio.gather(*(poll() for _ in range(concurrency)))
+            elapsed += time.perf_counter() - began
+            latencies.extend(latency for latency, _ in results)
+            errors += sum(status >= 400 for _, status in results)
+        return sorted(latencies), errors, elapsed
+
+    def report(self, name, route, latencies, errors, elapsed):
+        ms = lambda seconds: f"{seconds * 1000:.1f}"
+        self.stdout.write(
+            f"  {name} {route}: {len(latencies) / elapsed:.0f} polls/s, latency ms "
+            f"p50 {ms(statistics.median(latencies))} p90 {ms(percentile(latencies, 0.9))} "
+            f"p99 {ms(percentile(latencies, 0.99))} max {ms(latencies[-1])}"
+            + (f", {errors} error response(s)" if errors else "")
+        )
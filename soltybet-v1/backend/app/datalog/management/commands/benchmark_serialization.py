@@ -0,0 +1,63 @@
+import json
+import timeit
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from backend.encoders import dumps_str
+from backend.renderers import ORJSONRenderer
+from datalog.models import Fighter, Match, uuid7
+from datalog.serializers import FighterSerializer, MatchSerializer
+
+class Command(BaseCommand):
+    help = "Compare the JSON encoding cost of API responses and websocket broadcasts, stdlib json against orjson"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100,
+                            help="Rows of the rendered list page")
+        parser.add_argument('--clients', type=int, default=1000,
+                            help="Websocket clients a broadcast reaches in one worker")
+        parser.add_argument('--repeat', type=int, default=200,
+                            help="Timed runs per measurement")
+
+    def handle(self, *args, **options):
+        rows, clients, repeat = options['rows'], options['clients'], options['repeat']
+        if rows <= 0 or clients <= 0 or repeat <= 0:
+            raise CommandError("--rows, --clients and --repeat must be positive")
+
+        # Unsaved instances: the serializers only read attributes, no database is needed
+        fighters = [Fighter(name=f'fighter{index}', nb_fight=index, win=index // 2, lose=index - index // 2)
+                    for index in range(rows)]
+        red, blue = fighters[0], fighters[-1]
+        matches = [Match(red_id=red, blue_id=blue, vol_red=index * 10**9, vol_blue=index) for index in range(rows)]
+        pages = {
+            'fighters': FighterSerializer(fighters, many=True).data,
+            'matches': MatchSerializer(matches, many=True).data,
+        }
+        self.stdout.write(f"Per request: rendering a {rows}-row page, {repeat} run(s)")
+        for name, data in pages.items():
+            self.compare(name, repeat, {
+                'JSONRenderer': lambda: JSONRenderer().render(data),
+                'ORJSONRenderer': lambda: ORJSONRenderer().render(data),
+            })
+
+        state = {
+            "message": "Bets are open",
+            "redFighter": red.name,
+            "blueFighter": blue.name,
+            "m_id": str(uuid7()),
+            "total_red": 12.5,
+            "total_blue": 3.25,
+        }
+        self.stdout.write(f"Per broadcast: the phase state sent to {clients} client(s), {repeat} run(s)")
+        self.compare('phase state', repeat, {
+            # Each consumer encoding its own frame, as before
+            'json per client': lambda: [json.dumps(state) for _ in range(clients)],
+            'orjson per client': lambda: [dumps_str(state) for _ in range(clients)],
+            # The text is encoded once and shared by every consumer
+            'orjson once': lambda: dumps_str(state),
+        })
+
+    def compare(self, name, repeat, candidates):
+        timings = {label: min(timeit.repeat(run, number=1, repeat=repeat)) for label, run in candidates.items()}
+        baseline = next(iter(timings.values()))
+        for label, seconds in timings.items():
+            self.stdout.write(f"  {name}, {label}: {seconds * 1e6:.1f}us ({baseline / seconds:.1f}x)")
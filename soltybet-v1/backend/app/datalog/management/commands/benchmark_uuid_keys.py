@@ -0,0 +1,54 @@
+import time
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from datalog.models import uuid7
+
+GENERATORS = {
+    'uuid4': uuid.uuid4,
+    'uuid7': uuid7,
+}
+
+class Command(BaseCommand):
+    help = "Compare insert time and primary key index size of uuid4 and uuid7 keys"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000,
+                            help="Rows inserted per key type")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Rows per INSERT transaction, as during a bet rush")
+
+    def handle(self, *args, **options):
+        rows, batch_size = options['rows'], options['batch_size']
+        if rows <= 0 or batch_size <= 0:
+            raise CommandError("--rows and --batch-size must be positive")
+        if connection.vendor != 'postgresql':
+            raise CommandError("The benchmark measures PostgreSQL B-tree indexes")
+
+        self.stdout.write(f"Inserting {rows} row(s) per key type, {batch_size} per transaction")
+        for name, generate in GENERATORS.items():
+            table = f'benchmark_{name}_keys'
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+                # Same shape as a bet row key plus a little payload
+                cursor.execute(f"CREATE UNLOGGED TABLE {table} (id uuid PRIMARY KEY, volume bigint NOT NULL)")
+                try:
+                    elapsed = self.insert(cursor, table, generate, rows, batch_size)
+                    cursor.execute(f"SELECT pg_relation_size('{table}_pkey')")
+                    index_size = cursor.fetchone()[0]
+                finally:
+                    cursor.execute(f"DROP TABLE {table}")
+            self.stdout.write(
+                f"  {name}: {elapsed:.2f}s ({rows / elapsed:.0f} rows/s), "
+                f"primary key index {index_size / 1024 / 1024:.1f} MB"
+            )
+
+    def insert(self, cursor, table, generate, rows, batch_size):
+        elapsed = 0.0
+        for start in range(0, rows, batch_size):
+            batch = [(generate(), index) for index in range(start, min(start + batch_size, rows))]
+            began = time.perf_counter()
+            with transaction.atomic():
+                cursor.executemany(f"INSERT INTO {table} (id, volume) VALUES (%s, %s)", batch)
+            elapsed += time.perf_counter() - began
+        return elapsed
@@ -0,0 +1,63 @@
+import timeit
+from django.core.management.base import BaseCommand, CommandError
+from datalog.models import Bet, Fighter, Match
+from datalog.serializers import FighterSerializer, MatchSerializer, to_sol
+from datalog.serializers import BET_HISTORY_VALUES, FIGHTER_VALUES, MATCH_VALUES
+from datalog.serializers import bet_history_values, fighter_values, match_values
+
+def bet_history_instances(bets):
+    # The bet_history payload as it was built from model instances
+    return [{
+        'b_id': str(bet.b_id)[:4],
+        'team': bet.team,
+        'volume': to_sol(bet.volume),
+        'won': bet.payout > 0,
+        'payout': to_sol(bet.payout) if bet.payout > 0 else None,
+        'invalid_match': bet.invalid_match,
+        'date': bet.creation_date
+    } for bet in bets]
+
+class Command(BaseCommand):
+    help = "Compare the values() row builders of the hot reads with the serializers they replace"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100,
+                            help="Rows read per measurement (at most the stored ones)")
+        parser.add_argument('--repeat', type=int, default=50,
+                            help="Timed runs per measurement")
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        if rows <= 0 or repeat <= 0:
+            raise CommandError("--rows and --repeat must be positive")
+
+        # (model queryset, instance payload, values() fields, row builder)
+        cases = {
+            'fighters': (Fighter.objects.order_by('pk'), lambda objs: FighterSerializer(objs, many=True).data,
+                         FIGHTER_VALUES, fighter_values),
+            'matches': (Match.objects.order_by('-creation_date'), lambda objs: MatchSerializer(objs, many=True).data,
+                        MATCH_VALUES, match_values),
+            'bet history': (Bet.objects.order_by('-creation_date'), bet_history_instances,
+                            BET_HISTORY_VALUES, bet_history_values),
+        }
+        for name, (queryset, build_instances, fields, build_row) in cases.items():
+            instances = list(queryset[:rows])
+            if not instances:
+                self.stdout.write(f"  {name}: no stored rows, skipped")
+                continue
+            values = list(queryset.values(*fields)[:rows])
+            self.stdout.write(f"{name}: {len(instances)} row(s), {repeat} run(s)")
+            self.compare('build only', repeat, {
+                'instances': lambda: build_instances(instances),
+                'values()': lambda: [build_row(row) for row in values],
+            })
+            self.compare('query and build', repeat, {
+                'instances': lambda: build_instances(list(queryset[:rows])),
+                'values()': lambda: [build_row(row) for row in queryset.values(*fields)[:rows]],
+            })
+
+    def compare(self, name, repeat, candidates):
+        timings = {label: min(timeit.repeat(run, number=1, repeat=repeat)) for label, run in candidates.items()}
+        baseline = next(iter(timings.values()))
+        for label, seconds in timings.items():
+            self.stdout.write(f"  {name}, {label}: {seconds * 1e6:.1f}us ({baseline / seconds:.1f}x)")
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from datalog.models import User, Match, Bet, Global
+from datalog.serializers import LAMPORTS_PER_SOL
+
+AMOUNT_COLUMNS = {
+    User: ('total_volume', 'total_payout', 'total_gain', 'referral_gain'),
+    Match: ('vol_blue', 'vol_red'),
+    Bet: ('volume', 'payout'),
+    Global: ('global_volume_sol',),
+}
+
+class Command(BaseCommand):
+    help = "Convert the SOL decimal amount columns to bigint lamports (run by migration datalog 0002)"
+
+    def handle(self, *args, **options):
+        converted = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            for model, columns in AMOUNT_COLUMNS.items():
+                table = model._meta.db_table
+                pending = self.numeric_columns(cursor, table, columns)
+                if not pending:
+                    continue
+                # A generated pnl column blocks the type change; the migration adds it back
+                if model is User:
+                    cursor.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS pnl")
+                cursor.execute(
+                    f"ALTER TABLE {table} "
+                    + ", ".join(
+                        f"ALTER COLUMN {column} TYPE bigint USING round({column} * {LAMPORTS_PER_SOL})::bigint"
+                        for column in pending
+                    )
+                )
+                self.stdout.write(f"{table}: converted {', '.join(pending)} to lamports")
+                converted += len(pending)
+
+        if not converted:
+            self.stdout.write("Amounts already stored as lamports, nothing to do")
+
+    def numeric_columns(self, cursor, table, columns):
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = %s AND column_name = ANY(%s) AND data_type = 'numeric'",
+            [table, list(columns)]
+        )
+        return [row[0] for row in cursor.fetchall()]
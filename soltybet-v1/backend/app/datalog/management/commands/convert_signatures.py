@@ -0,0 +1,97 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from datalog.fields import BASE58_ALPHABET
+from datalog.models import Bet
+
+SIGNATURE_COLUMNS = ('tx_in', 'tx_out')
+
+# Session-local base58 decoder, so the rewrite happens in a single ALTER
+BASE58_DECODE_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION pg_temp.base58_decode(encoded text) RETURNS bytea AS $$
+DECLARE
+    number numeric := 0;
+    decoded bytea := ''::bytea;
+    position_ integer;
+BEGIN
+    IF encoded IS NULL THEN
+        RETURN NULL;
+    END IF;
+    FOR i IN 1..length(encoded) LOOP
+        position_ := strpos('{BASE58_ALPHABET}', substr(encoded, i, 1));
+        IF position_ = 0 THEN
+            RAISE EXCEPTION 'Invalid base58 signature: %', encoded;
+        END IF;
+        number := number * 58 + (position_ - 1);
+    END LOOP;
+    WHILE number > 0 LOOP
+        decoded := decode(lpad(to_hex(mod(number, 256)::integer), 2, '0'), 'hex') || decoded;
+        number := div(number, 256);
+    END LOOP;
+    RETURN decode(repeat('00', length(encoded) - length(ltrim(encoded, '1'))), 'hex') || decoded;
+END
+$$ LANGUAGE plpgsql IMMUTABLE
+"""
+
+class Command(BaseCommand):
+    help = "Convert the base58 text signature columns of bets to bytea (run by migration datalog 0002)"
+
+    def handle(self, *args, **options):
+        table = Bet._meta.db_table
+        pending = self.text_columns(table)
+        if not pending:
+            self.stdout.write("Signatures already stored as bytea, nothing to do")
+            return
+
+        with connection.cursor() as cursor:
+            for column in pending:
+                cursor.execute(
+                    f"SELECT count(*) FROM {table} WHERE {column} !~ '^[{BASE58_ALPHABET}]*$'"
+                )
+                invalid = cursor.fetchone()[0]
+                if invalid:
+                    raise CommandError(f"{invalid} bet(s) have a {column} that is not base58, fix them before converting")
+
+        before = self.sizes(table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(BASE58_DECODE_FUNCTION)
+            cursor.execute(
+                f"ALTER TABLE {table} "
+                + ", ".join(
+                    f"ALTER COLUMN {column} TYPE bytea USING pg_temp.base58_decode({column})"
+                    for column in pending
+                )
+            )
+        after = self.sizes(table)
+
+        self.stdout.write(f"{table}: converted {', '.join(pending)} to bytea")
+        for label in ('table', 'indexes', 'total'):
+            saved = before[label] - after[label]
+            self.stdout.write(
+                f"  {label}: {self.pretty(before[label])} -> {self.pretty(after[label])} "
+                f"({self.pretty(saved)} saved)"
+            )
+
+    def text_columns(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_name = %s AND column_name = ANY(%s) AND data_type <> 'bytea'",
+                [table, list(SIGNATURE_COLUMNS)]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def sizes(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_table_size(%s), pg_indexes_size(%s), pg_total_relation_size(%s)",
+                [table] * 3
+            )
+            table_size, indexes_size, total_size = cursor.fetchone()
+        return {'table': table_size, 'indexes': indexes_size, 'total': total_size}
+
+    def pretty(self, size):
+        for unit in ('B', 'kB', 'MB', 'GB'):
+            if abs(size) < 1024:
+                return f"{size:.0f} {unit}"
+            size /= 1024
+        return f"{size:.1f} TB"
@@ -0,0 +1,113 @@
+import csv
+import io
+import sys
+import uuid
+from decimal import InvalidOperation
+from itertools import islice
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from datalog.models import Bet
+from datalog.fields import signature_bytes
+from datalog.serializers import to_lamports
+from datalog.totals import mark_totals_dirty, recompute_user_totals
+
+STAGING_TABLE = 'match_history_staging'
+REQUIRED_COLUMNS = ('bet_id', 'payout', 'valid_hash', 'invalid_match')
+
+class Command(BaseCommand):
+    help = "Apply the oracle's match_history.csv to bets with COPY and set-based UPDATEs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to match_history.csv, or '-' to read from stdin")
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help="Rows applied and committed per chunk")
+        parser.add_argument('--start-row', type=int, default=0,
+                            help="Skip the rows already committed by an interrupted run")
+        parser.add_argument('--skip-totals', action='store_true',
+                            help="Leave the affected users marked dirty instead of recomputing their totals "
+                                 "(PUT /api/users/user_totals/?incremental=1 catches them up)")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size <= 0:
+            raise CommandError("--chunk-size must be positive")
+        stream = sys.stdin if options['path'] == '-' else open(options['path'], newline='')
+        try:
+            reader = csv.DictReader(stream)
+            missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+            if missing:
+                raise CommandError(f"Missing columns in match history: {', '.join(missing)}")
+            row_number = options['start_row']
+            rows = islice(reader, row_number, None)
+            updated = skipped = 0
+            self.create_staging_table()
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                staged, invalid = self.prepare_chunk(chunk)
+                # Users are flagged in the chunk's transaction: if the run dies before the
+                # recompute below, the next incremental recompute still finds them
+                with transaction.atomic():
+                    chunk_users = self.apply_chunk(staged)
+                    mark_totals_dirty(set(chunk_users))
+                updated += len(chunk_users)
+                skipped += invalid
+                row_number += len(chunk)
+                self.stdout.write(
+                    f"{row_number} row(s) read, {updated} bet(s) updated, {skipped} row(s) skipped "
+                    f"(resume with --start-row {row_number})"
+                )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        if not options['skip_totals']:
+            # Also catches up the users of earlier interrupted runs
+            recomputed = recompute_user_totals(dirty_only=True)
+            self.stdout.write(f"Recomputed totals for {recomputed} user(s)")
+        self.stdout.write(self.style.SUCCESS(f"Match history imported: {updated} bet(s) updated"))
+
+    def create_staging_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} ("
+                "bet_id uuid PRIMARY KEY, payout bigint NOT NULL, "
+                "valid_hash bytea NOT NULL, invalid_match boolean"
+                ") ON COMMIT DELETE ROWS"
+            )
+
+    def prepare_chunk(self, chunk):
+        """Validate the CSV rows and render them as a COPY payload keyed by bet id."""
+        staged = {}
+        invalid = 0
+        for row in chunk:
+            try:
+                bet_id = uuid.UUID(row['bet_id'])
+                payout = to_lamports(row['payout'])
+                valid_hash = signature_bytes(row['valid_hash'])
+            except (ValueError, TypeError, InvalidOperation, OverflowError, ValidationError):
+                invalid += 1
+                continue
+            # A bet listed twice keeps its last entry, as successive PUTs would
+            staged[bet_id] = (bet_id, payout, '\\x' + valid_hash.hex(), row['invalid_match'] or '')
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(staged.values())
+        buffer.seek(0)
+        return buffer, invalid
+
+    def apply_chunk(self, buffer):
+        """COPY one chunk into the staging table and apply it; returns the affected user ids."""
+        bet_table = Bet._meta.db_table
+        with connection.cursor() as cursor:
+            with cursor.copy(f"COPY {STAGING_TABLE} FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (valid_hash))") as copy:
+                copy.write(buffer.read())
+            cursor.execute(
+                f"UPDATE {bet_table} AS b SET "
+                "payout = s.payout, tx_out = s.valid_hash, "
+                "success_out = octet_length(s.valid_hash) > 0, invalid_match = s.invalid_match "
+                f"FROM {STAGING_TABLE} AS s WHERE b.b_id = s.bet_id "
+                "RETURNING b.u_id_id"
+            )
+            return [row[0] for row in cursor.fetchall()]
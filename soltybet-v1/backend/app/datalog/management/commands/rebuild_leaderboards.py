@@ -0,0 +1,30 @@
+import logging
+from django.core.management.base import BaseCommand, CommandError
+from datalog.leaderboards import RANKED_BOARDS, rebuild_ranked_boards
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = "Reload the Redis ranked leaderboards from the stored user totals"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help="Users read and written to Redis per round trip")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError("--chunk-size must be positive")
+        try:
+            count = rebuild_ranked_boards(options['chunk_size'])
+        except Exception as e:
+            # Run at every container start: a Redis outage must not stop the
+            # backend, the next failed board update schedules a rebuild
+            logger.error(f"Ranked leaderboard rebuild failed: {e}")
+            self.stderr.write(self.style.ERROR(f"Ranked leaderboard rebuild failed: {e}"))
+            return
+        if count is None:
+            self.stdout.write("A ranked leaderboard rebuild is already running")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Ranked leaderboards rebuilt: {count} user(s) on {', '.join(RANKED_BOARDS)}"
+        ))
@@ -0,0 +1,131 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:48
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Fighter',
+            fields=[
+                ('f_id', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('nb_fight', models.PositiveIntegerField(default=0)),
+                ('nb_bet', models.PositiveIntegerField(default=0)),
+                ('win', models.PositiveIntegerField(default=0)),
+                ('lose', models.PositiveIntegerField(default=0)),
+                ('elo', models.DecimalField(decimal_places=2, default=1000, max_digits=10)),
+            ],
+            options={
+                'constraints': [models.CheckConstraint(condition=models.Q(('nb_fight__gte', 0)), name='fighter_check_nb_fight_gte_0'), models.CheckConstraint(condition=models.Q(('nb_bet__gte', 0)), name='fighter_check_nb_bet_gte_0'), models.CheckConstraint(condition=models.Q(('win__gte', 0)), name='fighter_check_win_gte_0'), models.CheckConstraint(condition=models.Q(('lose__gte', 0)), name='fighter_check_lose_gte_0'), models.CheckConstraint(condition=models.Q(('elo__gte', 0)), name='fighter_check_elo_gte_0')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Global',
+            fields=[
+                ('g_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('day', models.DateTimeField(default=django.utils.timezone.now)),
+                ('global_bet', models.PositiveIntegerField(default=0)),
+                ('global_fail', models.PositiveIntegerField(default=0)),
+                ('global_volume_sol', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('sol_price', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+            ],
+            options={
+                'constraints': [models.CheckConstraint(condition=models.Q(('global_bet__gte', 0)), name='global_check_global_bet_gte_0'), models.CheckConstraint(condition=models.Q(('global_fail__gte', 0)), name='global_check_global_fail_gte_0'), models.CheckConstraint(condition=models.Q(('global_volume_sol__gte', 0)), name='global_check_global_volume_sol_gte_0'), models.CheckConstraint(condition=models.Q(('sol_price__gte', 0)), name='global_check_sol_price_gte_0')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Match',
+            fields=[
+                ('m_id', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nb_bet', models.PositiveIntegerField(default=0)),
+                ('vol_blue', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('vol_red', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('creation_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('duration', models.DurationField(blank=True, null=True)),
+                ('blue_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blue_matches', to='datalog.fighter')),
+                ('red_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='red_matches', to='datalog.fighter')),
+                ('winner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='won_matches', to='datalog.fighter')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('u_id', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('wallet', models.CharField(db_index=True, max_length=44, unique=True)),
+                ('nb_bet', models.PositiveIntegerField(default=0)),
+                ('total_volume', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('total_payout', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('total_gain', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('ref_code', models.CharField(blank=True, max_length=20, null=True, unique=True)),
+                ('referral_gain', models.DecimalField(decimal_places=4, default=0, max_digits=12)),
+                ('country_code', models.CharField(default='zz', max_length=2)),
+                ('last_login', models.DateTimeField(default=django.utils.timezone.now)),
+                ('creation_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ref_id', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='datalog.user')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Bet',
+            fields=[
+                ('b_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('team', models.CharField(choices=[('red', 'red'), ('blue', 'blue')], default='red', max_length=4)),
+                ('tx_in', models.CharField(max_length=1232)),
+                ('success_in', models.BooleanField(blank=True, null=True)),
+                ('tx_out', models.CharField(blank=True, max_length=1232, null=True)),
+                ('success_out', models.BooleanField(blank=True, null=True)),
+                ('volume', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('payout', models.DecimalField(decimal_places=4, default=0, max_digits=12)),
+                ('invalid_match', models.BooleanField(blank=True, default=None, null=True)),
+                ('creation_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('f_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='datalog.fighter')),
+                ('m_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='datalog.match')),
+                ('u_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='datalog.user')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='match',
+            constraint=models.CheckConstraint(condition=models.Q(('nb_bet__gte', 0)), name='match_check_nb_bet_gte_0'),
+        ),
+        migrations.AddConstraint(
+            model_name='match',
+            constraint=models.CheckConstraint(condition=models.Q(('vol_blue__gte', 0)), name='match_check_vol_blue_gte_0'),
+        ),
+        migrations.AddConstraint(
+            model_name='match',
+            constraint=models.CheckConstraint(condition=models.Q(('vol_red__gte', 0)), name='match_check_vol_red_gte_0'),
+        ),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.CheckConstraint(condition=models.Q(('nb_bet__gte', 0)), name='user_check_nb_bet_gte_0'),
+        ),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.CheckConstraint(condition=models.Q(('total_volume__gte', 0)), name='user_check_total_volume_gte_0'),
+        ),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.CheckConstraint(condition=models.Q(('total_payout__gte', 0)), name='user_check_total_payout_gte_0'),
+        ),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.CheckConstraint(condition=models.Q(('total_gain__gte', 0)), name='user_check_total_gain_gte_0'),
+        ),
+        migrations.AddConstraint(
+            model_name='bet',
+            constraint=models.CheckConstraint(condition=models.Q(('volume__gte', 0)), name='bet_check_volume_gte_0'),
+        ),
+        migrations.AddConstraint(
+            model_name='bet',
+            constraint=models.CheckConstraint(condition=models.Q(('payout__gte', 0)), name='bet_check_payout_gte_0'),
+        ),
+    ]
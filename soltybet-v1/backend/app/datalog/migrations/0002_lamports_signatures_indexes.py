@@ -0,0 +1,142 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:48, then reordered by hand:
+# the stored values are converted first, the generated pnl column is built on
+# the converted columns. The indexes are built concurrently by 0003.
+
+import datalog.fields
+import datalog.models
+import django.contrib.postgres.operations
+import django.db.models.deletion
+import django.db.models.expressions
+from django.core.management import call_command
+from django.db import migrations, models
+
+
+def convert_stored_values(apps, schema_editor):
+    # Rewrites the columns in place (base58 text to bytea, SOL decimals to
+    # lamports); both commands do nothing on an already converted table
+    call_command('convert_signatures')
+    call_command('convert_lamports')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datalog', '0001_initial'),
+    ]
+
+    operations = [
+        # Backs the trigram index on fighter names, built by 0003
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(convert_stored_values, migrations.RunPython.noop),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='bet',
+                    name='tx_in',
+                    field=datalog.fields.SignatureField(max_length=88),
+                ),
+                migrations.AlterField(
+                    model_name='bet',
+                    name='tx_out',
+                    field=datalog.fields.SignatureField(blank=True, max_length=88, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='bet',
+                    name='payout',
+                    field=models.BigIntegerField(default=0),
+                ),
+                migrations.AlterField(
+                    model_name='bet',
+                    name='volume',
+                    field=models.BigIntegerField(default=0),
+                ),
+                migrations.AlterField(
+                    model_name='global',
+                    name='global_volume_sol',
+                    field=models.BigIntegerField(default=0),
+                ),
+                migrations.AlterField(
+                    model_name='match',
+                    name='vol_blue',
+                    field=models.BigIntegerField(default=0),
+                ),
+                migrations.AlterField(
+                    model_name='match',
+                    name='vol_red',
+                    field=models.BigIntegerField(default=0),
+                ),
+                migrations.AlterField(
+                    model_name='user',
+                    name='referral_gain',
+                    field=models.BigIntegerField(default=0),
+                ),
+                migrations.AlterField(
+                    model_name='user',
+                    name='total_gain',
+                    field=models.BigIntegerField(default=0),
+                ),
+                migrations.AlterField(
+                    model_name='user',
+                    name='total_payout',
+                    field=models.BigIntegerField(default=0),
+                ),
+                migrations.AlterField(
+                    model_name='user',
+                    name='total_volume',
+                    field=models.BigIntegerField(default=0),
+                ),
+            ],
+        ),
+        # Databases converted by an earlier entrypoint carry a hand-built pnl column
+        migrations.RunSQL(
+            'ALTER TABLE datalog_user DROP COLUMN IF EXISTS pnl',
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='pnl',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('total_gain'), '-', models.F('total_volume')), output_field=models.BigIntegerField()),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='totals_dirty',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='bet',
+            name='b_id',
+            field=models.UUIDField(default=datalog.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='bet',
+            name='f_id',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='datalog.fighter'),
+        ),
+        migrations.AlterField(
+            model_name='bet',
+            name='m_id',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='datalog.match'),
+        ),
+        migrations.AlterField(
+            model_name='bet',
+            name='u_id',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='datalog.user'),
+        ),
+        migrations.AlterField(
+            model_name='fighter',
+            name='f_id',
+            field=models.UUIDField(db_index=True, default=datalog.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='match',
+            name='m_id',
+            field=models.UUIDField(db_index=True, default=datalog.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='u_id',
+            field=models.UUIDField(db_index=True, default=datalog.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Split out of 0002: the indexes on the large bet and user tables are built
+# with CREATE INDEX CONCURRENTLY, which does not block writes while it runs
+# but cannot run inside a transaction, hence a non-atomic migration.
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('datalog', '0002_lamports_signatures_indexes'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='bet',
+            index=models.Index(fields=['creation_date', 'b_id'], name='bet_creation_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='bet',
+            index=models.Index(fields=['m_id', 'success_in', 'team'], include=('volume',), name='bet_match_team_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='bet',
+            index=models.Index(fields=['m_id', 'invalid_match'], name='bet_match_valid_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='bet',
+            index=models.Index(fields=['u_id', 'success_in', '-creation_date'], include=('volume', 'payout'), name='bet_user_history_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='bet',
+            index=models.Index(fields=['f_id', 'invalid_match'], name='bet_fighter_valid_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='fighter',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='fighter_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='global',
+            index=models.Index(fields=['day', 'g_id'], name='global_day_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='match',
+            index=models.Index(fields=['creation_date', 'm_id'], name='match_creation_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(fields=['creation_date', 'u_id'], name='user_creation_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(fields=['-pnl'], name='user_pnl_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(fields=['-total_volume'], name='user_total_volume_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(condition=models.Q(('totals_dirty', True)), fields=['u_id'], name='user_totals_dirty_idx'),
+        ),
+    ]
@@ -1,17 +1,37 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
 from django.utils import timezone
+from .fields import SignatureField
+import os
+import time
 import uuid
 
+def uuid7():
+    """Time-ordered UUID (RFC 9562 version 7): a millisecond timestamp then
+    random bits, so new keys land at the right edge of the primary key index."""
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), 'big')
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return uuid.UUID(int=value)
+
+# Amounts (volumes, payouts, gains) are integer lamports: 1 SOL = 10^9 lamports
+
 class User(models.Model):
-    u_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, db_index=True)
+    u_id = models.UUIDField(primary_key=True, default=uuid7, editable=False, db_index=True)
     wallet = models.CharField(max_length=44, unique=True, db_index=True)
     nb_bet = models.PositiveIntegerField(default=0)
-    total_volume = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    total_payout = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    total_gain = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    total_volume = models.BigIntegerField(default=0)
+    total_payout = models.BigIntegerField(default=0)
+    total_gain = models.BigIntegerField(default=0)
+    pnl = models.GeneratedField(
+        expression=models.F('total_gain') - models.F('total_volume'),
+        output_field=models.BigIntegerField(),
+        db_persist=True,
+    )
     ref_id = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL)
     ref_code = models.CharField(max_length=20, unique=True, null=True, blank=True)
-    referral_gain = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    referral_gain = models.BigIntegerField(default=0)
+    totals_dirty = models.BooleanField(default=False)
     country_code = models.CharField(max_length=2, default='zz')
     last_login = models.DateTimeField(default=timezone.now)
     creation_date = models.DateTimeField(default=timezone.now)
@@ -23,9 +43,15 @@ class User(models.Model):
             models.CheckConstraint(check=models.Q(total_payout__gte=0), name='user_check_total_payout_gte_0'),
             models.CheckConstraint(check=models.Q(total_gain__gte=0), name='user_check_total_gain_gte_0'),
         ]
+        indexes = [
+            models.Index(fields=['creation_date', 'u_id'], name='user_creation_idx'),
+            models.Index(fields=['-pnl'], name='user_pnl_idx'),
+            models.Index(fields=['-total_volume'], name='user_total_volume_idx'),
+            models.Index(fields=['u_id'], condition=models.Q(totals_dirty=True), name='user_totals_dirty_idx'),
+        ]
 
 class Fighter(models.Model):
-    f_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, db_index=True)
+    f_id = models.UUIDField(primary_key=True, default=uuid7, editable=False, db_index=True)
     name = models.CharField(max_length=100, unique=True)
     nb_fight = models.PositiveIntegerField(default=0)
     nb_bet = models.PositiveIntegerField(default=0)
@@ -41,15 +67,18 @@ class Fighter(models.Model):
             models.CheckConstraint(check=models.Q(lose__gte=0), name='fighter_check_lose_gte_0'),
             models.CheckConstraint(check=models.Q(elo__gte=0), name='fighter_check_elo_gte_0'),
         ]
+        indexes = [
+            GinIndex(fields=['name'], name='fighter_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
 class Match(models.Model):
-    m_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, db_index=True)
+    m_id = models.UUIDField(primary_key=True, default=uuid7, editable=False, db_index=True)
     red_id = models.ForeignKey(Fighter, related_name='red_matches', on_delete=models.CASCADE)
     blue_id = models.ForeignKey(Fighter, related_name='blue_matches', on_delete=models.CASCADE)
     winner = models.ForeignKey(Fighter, on_delete=models.SET_NULL, null=True, blank=True, related_name='won_matches')
     nb_bet = models.PositiveIntegerField(default=0)
-    vol_blue = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    vol_red = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    vol_blue = models.BigIntegerField(default=0)
+    vol_red = models.BigIntegerField(default=0)
     creation_date = models.DateTimeField(default=timezone.now)
     duration = models.DurationField(null=True, blank=True)
 
@@ -59,19 +88,23 @@ class Match(models.Model):
             models.CheckConstraint(check=models.Q(vol_blue__gte=0), name='match_check_vol_blue_gte_0'),
             models.CheckConstraint(check=models.Q(vol_red__gte=0), name='match_check_vol_red_gte_0'),
         ]
+        indexes = [
+            models.Index(fields=['creation_date', 'm_id'], name='match_creation_idx'),
+        ]
 
 class Bet(models.Model):
-    b_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    m_id = models.ForeignKey(Match, on_delete=models.CASCADE)
-    u_id = models.ForeignKey(User, on_delete=models.CASCADE)
-    f_id = models.ForeignKey(Fighter, on_delete=models.CASCADE)
+    b_id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    # Foreign keys are served by the composite indexes below, which lead with them
+    m_id = models.ForeignKey(Match, on_delete=models.CASCADE, db_index=False)
+    u_id = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    f_id = models.ForeignKey(Fighter, on_delete=models.CASCADE, db_index=False)
     team = models.CharField(max_length=4, choices=[('red', 'red'), ('blue', 'blue')], default='red')
-    tx_in = models.CharField(max_length=1232)
+    tx_in = SignatureField()
     success_in = models.BooleanField(null=True, blank=True)
-    tx_out = models.CharField(max_length=1232, null=True, blank=True)
+    tx_out = SignatureField(null=True, blank=True)
     success_out = models.BooleanField(null=True, blank=True)
-    volume = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    payout = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    volume = models.BigIntegerField(default=0)
+    payout = models.BigIntegerField(default=0)
     invalid_match = models.BooleanField(null=True, blank=True, default=None)
     creation_date = models.DateTimeField(default=timezone.now)
 
@@ -80,13 +113,20 @@ class Bet(models.Model):
             models.CheckConstraint(check=models.Q(volume__gte=0), name='bet_check_volume_gte_0'),
             models.CheckConstraint(check=models.Q(payout__gte=0), name='bet_check_payout_gte_0'),
         ]
+        indexes = [
+            models.Index(fields=['creation_date', 'b_id'], name='bet_creation_idx'),
+            models.Index(fields=['m_id', 'success_in', 'team'], include=['volume'], name='bet_match_team_idx'),
+            models.Index(fields=['m_id', 'invalid_match'], name='bet_match_valid_idx'),
+            models.Index(fields=['u_id', 'success_in', '-creation_date'], include=['volume', 'payout'], name='bet_user_history_idx'),
+            models.Index(fields=['f_id', 'invalid_match'], name='bet_fighter_valid_idx'),
+        ]
 
 class Global(models.Model):
     g_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     day = models.DateTimeField(default=timezone.now)
     global_bet = models.PositiveIntegerField(default=0)
     global_fail = models.PositiveIntegerField(default=0)
-    global_volume_sol = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    global_volume_sol = models.BigIntegerField(default=0)
     sol_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
     class Meta:
@@ -95,4 +135,7 @@ class Global(models.Model):
             models.CheckConstraint(check=models.Q(global_fail__gte=0), name='global_check_global_fail_gte_0'),
             models.CheckConstraint(check=models.Q(global_volume_sol__gte=0), name='global_check_global_volume_sol_gte_0'),
             models.CheckConstraint(check=models.Q(sol_price__gte=0), name='global_check_sol_price_gte_0'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'g_id'], name='global_day_idx'),
         ]
\ No newline at end of file
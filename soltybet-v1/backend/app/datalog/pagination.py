@@ -0,0 +1,85 @@
+import base64
+import json
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+class KeysetPagination(BasePagination):
+    """Newest-first cursor pagination over the view's `cursor_ordering` fields.
+
+    The cursor holds the key of the last row of the previous page, so each
+    page is an index range scan that costs the same however deep it is. The
+    body stays the bare list of rows the endpoints always returned; the next
+    page is announced in a Link header (RFC 8288), absent on the last page.
+    """
+    page_size = 100
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    default_ordering = ('creation_date', 'pk')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = getattr(view, 'cursor_ordering', self.default_ordering)
+        model = queryset.model
+        self.fields = [model._meta.pk if name == 'pk' else model._meta.get_field(name) for name in self.ordering]
+
+        queryset = queryset.order_by(*[f'-{name}' for name in self.ordering])
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor)))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        next_link = self.get_next_link()
+        headers = {'Link': f'<{next_link}>; rel="next"'} if next_link else None
+        return Response(data, headers=headers)
+
+    def get_paginated_response_schema(self, schema):
+        return schema
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        if isinstance(last, dict):
+            key = [str(last[field.attname]) for field in self.fields]
+        else:
+            key = [str(field.value_from_object(last)) for field in self.fields]
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(key))
+
+    def after(self, key):
+        """Rows strictly after `key` in descending (f1, f2, ...) order."""
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            equal = {previous: key[i] for i, previous in enumerate(self.ordering[:index])}
+            condition |= Q(**equal, **{f'{name}__lt': key[index]})
+        return condition
+
+    def encode_cursor(self, key):
+        return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(key) != len(self.fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(self.fields, key)]
+        except Exception:
+            raise NotFound("Invalid cursor")
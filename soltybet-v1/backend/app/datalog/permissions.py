@@ -1,7 +1,22 @@
 from rest_framework import permissions
-    
-class ReadOnlyForGrafanaPermission(permissions.BasePermission):
+
+class HasRole(permissions.BasePermission):
+    """Grants access to the service accounts listed in `roles`, read from the
+    role claim set by ServiceTokenAuthentication (no database access)."""
+    roles = ()
+    message = "API permission denied"
+
     def has_permission(self, request, view):
-        if request.user.username == 'grafana':
-            return request.method in permissions.SAFE_METHODS
-        return True
+        return getattr(request.user, 'role', None) in self.roles
+
+class IsFront(HasRole):
+    roles = ('front',)
+
+class IsScrap(HasRole):
+    roles = ('scrap',)
+
+class IsStats(HasRole):
+    roles = ('stats',)
+
+class IsFrontOrScrap(HasRole):
+    roles = ('front', 'scrap')
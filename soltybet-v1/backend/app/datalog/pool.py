@@ -0,0 +1,28 @@
+from django.db import connections
+
+def pool_metrics():
+    """Connection pool counters of this worker, per pooled database alias."""
+    metrics = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is None:
+            continue
+        stats = pool.get_stats()
+        queued = stats.get('requests_queued', 0)
+        metrics[alias] = {
+            'min_size': stats.get('pool_min'),
+            'max_size': stats.get('pool_max'),
+            'size': stats.get('pool_size', 0),
+            'available': stats.get('pool_available', 0),
+            'waiting': stats.get('requests_waiting', 0),
+            'checkouts': stats.get('requests_num', 0),
+            # Checkouts that found no idle connection and had to wait
+            'queued': queued,
+            'wait_ms': stats.get('requests_wait_ms', 0),
+            'avg_wait_ms': round(stats.get('requests_wait_ms', 0) / queued, 2) if queued else 0,
+            'timeouts': stats.get('requests_errors', 0),
+            'connections_opened': stats.get('connections_num', 0),
+            'connection_errors': stats.get('connections_errors', 0),
+            'connections_lost': stats.get('connections_lost', 0),
+        }
+    return metrics
@@ -1,17 +1,70 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_EVEN
 from rest_framework import serializers
 from .models import User, Match, Bet, Fighter, Global
 
+# Amounts are stored as integer lamports and exchanged in SOL
+LAMPORTS_PER_SOL = 1_000_000_000
+
+def to_lamports(sol):
+    """SOL amount (number or numeric string) to integer lamports."""
+    return int((Decimal(str(sol)) * LAMPORTS_PER_SOL).to_integral_value(ROUND_HALF_EVEN))
+
+def to_sol(lamports):
+    """Integer lamports to a SOL float, for hand-built responses."""
+    return (lamports or 0) / LAMPORTS_PER_SOL
+
+def sol_string(lamports, decimal_places=2):
+    """Integer lamports to the SOL decimal string the API exposes."""
+    return str((Decimal(lamports) / LAMPORTS_PER_SOL).quantize(Decimal(1).scaleb(-decimal_places)))
+
+class SolAmountField(serializers.Field):
+    """Lamports in the model, a SOL decimal string in the API, rendered with
+    the same number of places as the former DecimalField."""
+    default_error_messages = {
+        'invalid': 'A valid SOL amount is required.',
+        'min_value': 'Ensure this amount is greater than or equal to 0.',
+    }
+
+    def __init__(self, decimal_places=2, **kwargs):
+        self.decimal_places = decimal_places
+        kwargs.setdefault('required', False)
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return sol_string(value, self.decimal_places)
+
+    def to_internal_value(self, data):
+        try:
+            lamports = to_lamports(data)
+        except (InvalidOperation, TypeError, ValueError, OverflowError):
+            self.fail('invalid')
+        if lamports < 0:
+            self.fail('min_value')
+        return lamports
+
 class UserSerializer(serializers.ModelSerializer):
+    total_volume = SolAmountField()
+    total_payout = SolAmountField()
+    total_gain = SolAmountField()
+    pnl = SolAmountField(read_only=True)
+    referral_gain = SolAmountField(decimal_places=4)
+
     class Meta:
         model = User
         fields = '__all__'
 
 class MatchSerializer(serializers.ModelSerializer):
+    vol_blue = SolAmountField()
+    vol_red = SolAmountField()
+
     class Meta:
         model = Match
         fields = '__all__'
 
 class BetSerializer(serializers.ModelSerializer):
+    volume = SolAmountField()
+    payout = SolAmountField(decimal_places=4)
+
     class Meta:
         model = Bet
         fields = '__all__'
@@ -22,6 +75,64 @@ class FighterSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class GlobalSerializer(serializers.ModelSerializer):
+    global_volume_sol = SolAmountField()
+
     class Meta:
         model = Global
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+# Read paths for the hot endpoints: the same JSON as the serializers above,
+# built from .values() rows without model instances or per-row field objects
+_datetime = serializers.DateTimeField()
+_duration = serializers.DurationField()
+_elo = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+MATCH_VALUES = ('m_id', 'vol_blue', 'vol_red', 'nb_bet', 'creation_date', 'duration', 'red_id', 'blue_id', 'winner')
+FIGHTER_VALUES = ('f_id', 'name', 'nb_fight', 'nb_bet', 'win', 'lose', 'elo')
+
+def match_values(row):
+    return {
+        'm_id': str(row['m_id']),
+        'vol_blue': sol_string(row['vol_blue']),
+        'vol_red': sol_string(row['vol_red']),
+        'nb_bet': row['nb_bet'],
+        'creation_date': _datetime.to_representation(row['creation_date']),
+        'duration': _duration.to_representation(row['duration']) if row['duration'] is not None else None,
+        'red_id': row['red_id'],
+        'blue_id': row['blue_id'],
+        'winner': row['winner'],
+    }
+
+def fighter_values(row):
+    return {
+        'f_id': str(row['f_id']),
+        'name': row['name'],
+        'nb_fight': row['nb_fight'],
+        'nb_bet': row['nb_bet'],
+        'win': row['win'],
+        'lose': row['lose'],
+        'elo': _elo.to_representation(row['elo']),
+    }
+
+VOLUMES_VALUES = ('vol_red', 'vol_blue', 'nb_bet')
+BET_HISTORY_VALUES = ('b_id', 'team', 'volume', 'payout', 'invalid_match', 'creation_date')
+
+def volumes_values(row):
+    return {
+        "total_red": to_sol(row['vol_red']),
+        "total_blue": to_sol(row['vol_blue']),
+        "debug_info": {
+            "total_bets": row['nb_bet']
+        }
+    }
+
+def bet_history_values(row):
+    return {
+        'b_id': str(row['b_id'])[:4],  # Tronqué
+        'team': row['team'],
+        'volume': to_sol(row['volume']),
+        'won': row['payout'] > 0,
+        'payout': to_sol(row['payout']) if row['payout'] > 0 else None,
+        'invalid_match': row['invalid_match'],
+        'date': row['creation_date']
+    }
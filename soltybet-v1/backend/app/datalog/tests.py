@@ -1,3 +1,962 @@
-from django.test import TestCase
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+from asgiref.sync import async_to_sync, sync_to_async
+from datetime import date, datetime, time as time_of_day, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Sum
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from datalog.fields import SIGNATURE_LENGTH, b58encode
+from datalog.filters import UserFilter, FighterFilter, MatchFilter, BetFilter, GlobalFilter
+from datalog.models import User, Fighter, Match, Bet, uuid7
+from backend import db_router
+from backend.encoders import OPTIONS, dumps
+from backend.renderers import ORJSONRenderer
+from datalog.serializers import UserSerializer, MatchSerializer, BetSerializer, FighterSerializer, SolAmountField, to_lamports, to_sol, sol_string
+from datalog.serializers import MATCH_VALUES, FIGHTER_VALUES, VOLUMES_VALUES, BET_HISTORY_VALUES
+from datalog.serializers import match_values, fighter_values, volumes_values, bet_history_values
+from datalog.views import BetViewSet, FighterViewSet, MatchViewSet, UserViewSet
+from datalog.pool import pool_metrics
+from datalog import async_views, authentication, caching, leaderboards
+from datalog.totals import mark_totals_dirty, recompute_user_totals
+
+def service_user(role):
+    user = get_user_model().objects.create_user(role, password='x')
+    user.role = role
+    return user
+
+def put(view, action, payload, user):
+    request = APIRequestFactory().put('/', payload, format='json')
+    force_authenticate(request, user)
+    return view.as_view({'put': action}, **getattr(view, action).kwargs)(request)
+
+def call(view, path, user, **initkwargs):
+    request = APIRequestFactory().get(path)
+    force_authenticate(request, user)
+    return view.as_view({'get': 'list'}, **initkwargs)(request)
+
+class MigrationsTest(TestCase):
+    def test_models_match_migrations(self):
+        # The entrypoint only runs migrate: a model change without its migration never reaches the database
+        call_command('makemigrations', 'datalog', check=True, dry_run=True, stdout=StringIO())
+
+def explain(queryset):
+    """PostgreSQL plan of `queryset`; the test tables are nearly empty, so
+    sequential scans are disabled to let the planner use any index that applies."""
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+    return queryset.explain()
+
+class UUID7Test(SimpleTestCase):
+    def test_layout(self):
+        before = time.time_ns() // 1_000_000
+        key = uuid7()
+        after = time.time_ns() // 1_000_000
+        self.assertEqual(key.version, 7)
+        self.assertEqual(key.variant, uuid.RFC_4122)
+        self.assertTrue(before <= key.int >> 80 <= after)
+
+    def test_keys_sort_by_creation_time(self):
+        keys = []
+        for _ in range(3):
+            keys.append(uuid7())
+            time.sleep(0.002)
+        self.assertEqual(sorted(keys), keys)
+        self.assertEqual(len({uuid7() for _ in range(10000)}), 10000)
+
+    @skipUnless(connection.vendor != 'postgresql', 'checks the refusal on other databases')
+    def test_benchmark_needs_postgresql(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_uuid_keys', rows=10, stdout=StringIO())
+
+@skipUnless(connection.vendor == 'postgresql', 'the benchmark runs on PostgreSQL')
+class UUIDKeyBenchmarkTest(TestCase):
+    def test_benchmark_runs(self):
+        out = StringIO()
+        call_command('benchmark_uuid_keys', rows=2000, batch_size=500, stdout=out)
+        self.assertIn('uuid4:', out.getvalue())
+        self.assertIn('uuid7:', out.getvalue())
+
+class SolAmountCompatTest(SimpleTestCase):
+    """Lamport amounts render exactly like the former SOL DecimalFields."""
+    AMOUNTS = ('0', '0.01', '0.1', '1', '1.5', '12.34', '0.0001', '2.5678', '99999999.99')
+
+    def assert_same_representation(self, decimal_places, max_digits):
+        former = serializers.DecimalField(max_digits=max_digits, decimal_places=decimal_places)
+        field = SolAmountField(decimal_places=decimal_places)
+        for amount in self.AMOUNTS:
+            value = Decimal(amount).quantize(Decimal(1).scaleb(-decimal_places))
+            with self.subTest(amount=amount):
+                self.assertEqual(field.to_representation(to_lamports(value)), former.to_representation(value))
+
+    def test_two_places(self):
+        self.assert_same_representation(2, 10)
+
+    def test_four_places(self):
+        self.assert_same_representation(4, 12)
+
+    def test_input_round_trip(self):
+        field = SolAmountField(decimal_places=4)
+        for data in ('1.2345', 1.2345, '0.1', 3):
+            with self.subTest(data=data):
+                self.assertEqual(field.to_representation(field.to_internal_value(data)), str(Decimal(str(data)).quantize(Decimal('0.0001'))))
+
+    def test_sub_place_lamports_are_rounded_half_even(self):
+        self.assertEqual(sol_string(5_000_000), '0.00')
+        self.assertEqual(sol_string(15_000_000), '0.02')
+
+    def test_invalid_amounts(self):
+        field = SolAmountField()
+        for data in ('abc', None, '-1'):
+            with self.subTest(data=data), self.assertRaises(serializers.ValidationError):
+                field.to_internal_value(data)
+
+class SignatureFieldTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.front, cls.scrap = service_user('front'), service_user('scrap')
+        red = Fighter.objects.create(name='red')
+        match = Match.objects.create(red_id=red, blue_id=Fighter.objects.create(name='blue'))
+        cls.bet = Bet.objects.create(m_id=match, u_id=User.objects.create(wallet='player'), f_id=red, tx_in='')
+        cls.signature = b58encode(bytes(range(1, SIGNATURE_LENGTH + 1)))
+
+    def test_signature_round_trip(self):
+        self.bet.tx_in = self.signature
+        self.bet.save()
+        self.bet.refresh_from_db()
+        self.assertEqual(self.bet.tx_in, self.signature)
+
+    def test_invalid_signatures_are_not_stored(self):
+        for value in (b58encode(b'short'), '0OIl' * 22):
+            self.bet.tx_out = value
+            with self.subTest(value=value), self.assertRaises(ValidationError):
+                self.bet.save()
+            with self.subTest(value=value), self.assertRaises(ValidationError):
+                Bet.objects.bulk_update([self.bet], ['tx_out'])
+
+    def test_views_reject_invalid_signatures(self):
+        response = put(BetViewSet, 'confirm_bet', {'b_id': str(self.bet.b_id), 'tx_in': 'abc', 'volume': '1'}, self.front)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': f'A transaction signature is {SIGNATURE_LENGTH} bytes, got 3'})
+        payload = [{'bet_id': str(self.bet.b_id), 'payout': 1, 'valid_hash': 'abc', 'invalid_match': False}]
+        self.assertEqual(put(BetViewSet, 'bet_payout', payload, self.scrap).status_code, 400)
+        self.bet.refresh_from_db()
+        self.assertEqual((self.bet.tx_in, self.bet.tx_out), ('', None))
+        self.assertFalse(self.bet.success_in)
+
+class SolPayloadCompatTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            wallet='w1', total_volume=to_lamports('12.5'), total_payout=to_lamports('20'),
+            total_gain=to_lamports('7.25'), referral_gain=to_lamports('0.0123'),
+        )
+        red = Fighter.objects.create(name='red')
+        blue = Fighter.objects.create(name='blue')
+        match = Match.objects.create(red_id=red, blue_id=blue)
+        cls.bet = Bet.objects.create(
+            m_id=match, u_id=cls.user, f_id=red, tx_in='', volume=to_lamports('1.5'), payout=to_lamports('2.8765'),
+        )
+
+    def test_user_amounts(self):
+        user = User.objects.get(pk=self.user.pk)
+        data = UserSerializer(user).data
+        self.assertEqual(data['total_volume'], '12.50')
+        self.assertEqual(data['total_payout'], '20.00')
+        self.assertEqual(data['total_gain'], '7.25')
+        self.assertEqual(data['pnl'], '-5.25')
+        self.assertEqual(data['referral_gain'], '0.0123')
+
+    def test_bet_amounts(self):
+        data = BetSerializer(Bet.objects.get(pk=self.bet.pk)).data
+        self.assertEqual(data['volume'], '1.50')
+        self.assertEqual(data['payout'], '2.8765')
+
+@skipUnless(connection.vendor == 'postgresql', 'query plans are checked on PostgreSQL')
+class FilterIndexPlanTest(TestCase):
+    """Every declared filter is answered from an index, never a sequential scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(wallet='AbCdEf')
+        cls.fighter = Fighter.objects.create(name='ryu')
+        cls.match = Match.objects.create(red_id=cls.fighter, blue_id=Fighter.objects.create(name='ken'))
+
+    def plan(self, filterset_class, params):
+        filterset = filterset_class(params, queryset=filterset_class._meta.model.objects.all())
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+        plan = explain(filterset.qs)
+        self.assertNotIn('Seq Scan', plan)
+        return plan
+
+    def test_wallet_and_ref_code_prefixes(self):
+        self.assertRegex(self.plan(UserFilter, {'wallet__startswith': 'AbC'}), r'datalog_user_wallet_\w+_like')
+        self.assertRegex(self.plan(UserFilter, {'ref_code__startswith': 'AbC'}), r'datalog_user_ref_code_\w+_like')
+
+    def test_fighter_name_search(self):
+        self.assertIn('fighter_name_trgm_idx', self.plan(FighterFilter, {'search': 'ryu'}))
+
+    def test_bet_keys(self):
+        self.assertRegex(self.plan(BetFilter, {'m_id': self.match.pk}), r'bet_match_(team|valid)_idx')
+        self.assertIn('bet_user_history_idx', self.plan(BetFilter, {'u_id': self.user.pk}))
+        self.assertIn('bet_fighter_valid_idx', self.plan(BetFilter, {'f_id': self.fighter.pk}))
+
+    def test_creation_date_ranges(self):
+        params = {'creation_date__gte': '2024-01-01T00:00:00Z'}
+        self.assertIn('user_creation_idx', self.plan(UserFilter, params))
+        self.assertIn('match_creation_idx', self.plan(MatchFilter, params))
+        self.assertIn('bet_creation_idx', self.plan(BetFilter, params))
+        self.assertIn('global_day_idx', self.plan(GlobalFilter, {'day__gte': '2024-01-01T00:00:00Z'}))
+
+class ValuesRowTest(TestCase):
+    """The values() row builders of the hot reads render the same JSON as
+    the serializers and instance-based code they replace."""
+
+    @classmethod
+    def setUpTestData(cls):
+        red = Fighter.objects.create(name='red', nb_fight=3, win=2, lose=1, elo=Decimal('1012.5'))
+        blue = Fighter.objects.create(name='blue')
+        cls.matches = [
+            Match.objects.create(red_id=red, blue_id=blue, nb_bet=2, vol_red=to_lamports('1.005'), vol_blue=to_lamports('2')),
+            Match.objects.create(red_id=red, blue_id=blue, winner=red, duration=timedelta(minutes=3, seconds=7)),
+        ]
+        user = User.objects.create(wallet='player')
+        cls.bets = [
+            Bet.objects.create(m_id=cls.matches[0], u_id=user, f_id=red, tx_in='', team='red',
+                               success_in=True, volume=to_lamports('1.005'), payout=payout)
+            for payout in (0, to_lamports('2.0101'))
+        ]
+
+    def assertSameJSON(self, rows, expected):
+        # Compared as bytes: the key order is part of the payload
+        self.assertEqual(dumps(rows), dumps(expected))
+
+    def test_match_values(self):
+        rows = [match_values(row) for row in Match.objects.order_by('creation_date').values(*MATCH_VALUES)]
+        self.assertSameJSON(rows, MatchSerializer(self.matches, many=True).data)
+
+    def test_fighter_values(self):
+        rows = [fighter_values(row) for row in Fighter.objects.order_by('name').values(*FIGHTER_VALUES)]
+        self.assertSameJSON(rows, FighterSerializer(Fighter.objects.order_by('name'), many=True).data)
+
+    def test_volumes_values(self):
+        match = self.matches[0]
+        row = Match.objects.filter(pk=match.pk).values(*VOLUMES_VALUES).get()
+        self.assertSameJSON(volumes_values(row), {
+            "total_red": to_sol(match.vol_red),
+            "total_blue": to_sol(match.vol_blue),
+            "debug_info": {"total_bets": match.nb_bet},
+        })
+
+    def test_bet_history_values(self):
+        rows = [bet_history_values(row) for row in Bet.objects.order_by('creation_date').values(*BET_HISTORY_VALUES)]
+        self.assertSameJSON(rows, [{
+            'b_id': str(bet.b_id)[:4],
+            'team': bet.team,
+            'volume': to_sol(bet.volume),
+            'won': bet.payout > 0,
+            'payout': to_sol(bet.payout) if bet.payout > 0 else None,
+            'invalid_match': bet.invalid_match,
+            'date': bet.creation_date,
+        } for bet in self.bets])
+
+class ValuesRowBenchmarkTest(TestCase):
+    def test_benchmark_runs(self):
+        red = Fighter.objects.create(name='red')
+        match = Match.objects.create(red_id=red, blue_id=Fighter.objects.create(name='blue'))
+        Bet.objects.create(m_id=match, u_id=User.objects.create(wallet='player'), f_id=red, tx_in='')
+        out = StringIO()
+        call_command('benchmark_values_rows', rows=10, repeat=2, stdout=out)
+        for name in ('fighters', 'matches', 'bet history'):
+            self.assertIn(f'{name}: ', out.getvalue())
+        self.assertIn('query and build, values():', out.getvalue())
+
+class ORJSONRendererTest(TestCase):
+    """ORJSONRenderer writes the bytes DRF's JSONRenderer would."""
+
+    def assertSameRender(self, data):
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_builtin_and_django_types(self):
+        self.assertSameRender({
+            'int': 1, 'big': 2 ** 60, 'float': 0.1, 'bool': [True, False], 'none': None, 1: 'int key',
+            'decimal': Decimal('1.50'), 'uuid': uuid7(), 'aware': timezone.now(),
+            'naive': datetime(2024, 1, 2, 3, 4, 5, 123456), 'date': date(2024, 1, 2), 'time': time_of_day(1, 2, 3, 400),
+            'duration': timedelta(minutes=3), 'lazy': gettext_lazy('hello'), 'tuple': (1, 2), 'set': {3}, 'bytes': b'ab',
+            'text': 'é ✓ "quoted" </script>\u2028\u2029', 'nested': {'list': [{'float': 1.0}]},
+        })
+
+    def test_serializer_payloads(self):
+        red = Fighter.objects.create(name='red', elo=Decimal('1012.5'))
+        match = Match.objects.create(red_id=red, blue_id=Fighter.objects.create(name='blue'), duration=timedelta(seconds=90))
+        user = User.objects.create(wallet='player', total_volume=to_lamports('1.25'))
+        bet = Bet.objects.create(m_id=match, u_id=user, f_id=red, tx_in='', volume=to_lamports('1.25'))
+        for serializer in (FighterSerializer(red), MatchSerializer(match), UserSerializer(user), BetSerializer(bet)):
+            self.assertSameRender(serializer.data)
+
+    def test_exponent_floats_decode_equal(self):
+        # Both are valid JSON for the same number, only spelled 1e+20 and 1e20
+        data = {'large': 1e20, 'small': 1e-7}
+        self.assertEqual(orjson.loads(ORJSONRenderer().render(data)), orjson.loads(JSONRenderer().render(data)))
+
+    def test_indent_decodes_equal(self):
+        data = {'nested': {'list': [1, 2]}}
+        media_type = 'application/json; indent=4'
+        self.assertEqual(
+            orjson.loads(ORJSONRenderer().render(data, media_type)),
+            orjson.loads(JSONRenderer().render(data, media_type)),
+        )
+
+    def test_numpy_arrays_are_not_special_cased(self):
+        self.assertFalse(OPTIONS & orjson.OPT_SERIALIZE_NUMPY)
+
+class SerializationBenchmarkTest(SimpleTestCase):
+    def test_benchmark_runs(self):
+        out = StringIO()
+        call_command('benchmark_serialization', rows=5, clients=10, repeat=2, stdout=out)
+        for label in ('fighters, ORJSONRenderer:', 'matches, JSONRenderer:', 'phase state, orjson once:'):
+            self.assertIn(label, out.getvalue())
+
+class ListPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.front = service_user('front')
+        for index in range(5):
+            Fighter.objects.create(name=f'fighter{index}')
+            User.objects.create(wallet=f'wallet{index}')
+
+    def pages(self, viewset, page_size):
+        path, seen = f'/?page_size={page_size}', []
+        while path:
+            response = call(viewset, path, self.front)
+            self.assertEqual(response.status_code, 200)
+            # Same bare list body as before pagination; the cursor is in the Link header
+            self.assertIsInstance(response.data, list)
+            seen.append(response.data)
+            link = response.headers.get('Link')
+            path = link[1:link.index('>')] if link else None
+        return seen
+
+    def test_values_path_pages(self):
+        pages = self.pages(FighterViewSet, 2)
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        names = [row['name'] for page in pages for row in page]
+        self.assertEqual(sorted(names), [f'fighter{index}' for index in range(5)])
+
+    def test_serializer_path_pages(self):
+        pages = self.pages(UserViewSet, 3)
+        self.assertEqual([len(page) for page in pages], [3, 2])
+        self.assertEqual(len({row['u_id'] for page in pages for row in page}), 5)
+
+    def test_last_page_has_no_link(self):
+        response = call(FighterViewSet, '/', self.front)
+        self.assertEqual(len(response.data), 5)
+        self.assertNotIn('Link', response.headers)
+
+class NDJSONStreamTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.front = service_user('front')
+        for index in range(5):
+            Fighter.objects.create(name=f'fighter{index}')
+            User.objects.create(wallet=f'wallet{index}')
+
+    async def stream(self, viewset):
+        # As under ASGI: the sync view runs on a thread, the rows are consumed on the event loop
+        response = await sync_to_async(call)(viewset, '/?stream=ndjson', self.front)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        return [orjson.loads(line) for line in content.splitlines()]
+
+    async def test_values_path_matches_serializer(self):
+        with self.settings(NDJSON_CHUNK_SIZE=2):
+            rows = await self.stream(FighterViewSet)
+        expected = await sync_to_async(lambda: FighterSerializer(Fighter.objects.order_by('-pk'), many=True).data)()
+        self.assertEqual(rows, orjson.loads(dumps(expected)))
+
+    async def test_serializer_path_in_chunks(self):
+        with self.settings(NDJSON_CHUNK_SIZE=2):
+            rows = await self.stream(UserViewSet)
+        expected = await sync_to_async(lambda: UserSerializer(User.objects.order_by('-creation_date', '-pk'), many=True).data)()
+        self.assertEqual(rows, orjson.loads(dumps(expected)))
+
+    async def test_rows_are_read_from_the_database_routed_with_the_request(self):
+        reads = []
+        def db_for_read(router, model, **hints):
+            reads.append(db_router._routing.get() is not None)
+            return 'default'
+        middleware = db_router.ReplicaRoutingMiddleware(lambda request: call(FighterViewSet, '/?stream=ndjson', self.front))
+        with mock.patch.object(db_router.ReplicaRouter, 'db_for_read', db_for_read):
+            response = await sync_to_async(middleware)(RequestFactory().get('/'))
+            self.assertIsNone(db_router._routing.get())
+            content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.splitlines()), 5)
+        # Routed once, while the middleware still held the request's routing state
+        self.assertTrue(reads)
+        self.assertTrue(all(reads))
+
+class AsyncViewParityTest(TestCase):
+    """The async views answer like the viewset actions they shadow."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.front, cls.scrap = service_user('front'), service_user('scrap')
+        red, blue = Fighter.objects.create(name='red'), Fighter.objects.create(name='blue')
+        cls.match = Match.objects.create(red_id=red, blue_id=blue, nb_bet=2, vol_red=to_lamports('1.5'), vol_blue=to_lamports('0.25'))
+        player = User.objects.create(wallet='player', total_volume=to_lamports('1.75'), total_gain=to_lamports('3'))
+        User.objects.create(wallet='idle')
+        for team, fighter, volume, payout in (('red', red, '1.5', '3'), ('blue', blue, '0.25', '0')):
+            Bet.objects.create(m_id=cls.match, u_id=player, f_id=fighter, tx_in='', team=team, success_in=True,
+                               volume=to_lamports(volume), payout=to_lamports(payout))
+
+    def headers(self, user):
+        if user is None:
+            return {}
+        token = authentication.RoleTokenObtainPairSerializer.get_token(user).access_token
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def assertSameResponse(self, viewset, action, async_view, user=None, params=None, method='get', **headers):
+        headers = {**self.headers(user), **headers}
+        # Each side computes its own answer rather than reading the other one's cache entries
+        cache.clear()
+        request = getattr(APIRequestFactory(), method)('/', params, **headers)
+        expected = viewset.as_view({'get': action}, **getattr(viewset, action).kwargs)(request)
+        expected.render()
+        cache.clear()
+        response = async_to_sync(async_view)(getattr(APIRequestFactory(), method)('/', params, **headers))
+        self.assertEqual(
+            (response.status_code, response.content),
+            (expected.status_code, expected.content),
+            f'{async_view.__name__} {params}'
+        )
+
+    def test_authentication_and_permissions(self):
+        self.assertSameResponse(MatchViewSet, 'latest', async_views.latest)
+        self.assertSameResponse(MatchViewSet, 'latest', async_views.latest, self.scrap)
+        self.assertSameResponse(MatchViewSet, 'latest', async_views.latest, HTTP_AUTHORIZATION='Bearer invalid')
+        self.assertSameResponse(MatchViewSet, 'latest', async_views.latest, self.front, method='post')
+        self.assertSameResponse(MatchViewSet, 'latest', async_views.latest, method='post')
+
+    def test_latest(self):
+        self.assertSameResponse(MatchViewSet, 'latest', async_views.latest, self.front)
+        Match.objects.all().delete()
+        self.assertSameResponse(MatchViewSet, 'latest', async_views.latest, self.front)
+
+    def test_get_volumes(self):
+        for params in ({'m_id': self.match.m_id}, {'m_id': uuid7()}, {}):
+            self.assertSameResponse(BetViewSet, 'get_volumes', async_views.get_volumes, self.scrap, params)
+
+    def test_expected_wins_data(self):
+        for wallet in ('player', 'idle', 'ghost'):
+            params = {'m_id': self.match.m_id, 'wallet': wallet}
+            self.assertSameResponse(UserViewSet, 'expected_wins_data', async_views.expected_wins_data, self.front, params)
+        self.assertSameResponse(UserViewSet, 'expected_wins_data', async_views.expected_wins_data, self.front, {'wallet': 'player'})
+
+    def test_bet_history(self):
+        for params in ({'wallet': 'player'}, {'wallet': 'idle'}, {'wallet': 'ghost'}, {}):
+            self.assertSameResponse(BetViewSet, 'bet_history', async_views.bet_history, self.front, params)
+
+    def test_leaderboards(self):
+        for params in ({}, {'limit': 1}, {'limit': 'x'}, {'limit': 1000}):
+            self.assertSameResponse(UserViewSet, 'top_volume', async_views.top_volume, self.front, params)
+        for params in ({}, {'window': '24h'}, {'window': '7d', 'limit': 1}, {'window': 'day'}, {'window': 'decade'}):
+            self.assertSameResponse(UserViewSet, 'top_gain', async_views.top_gain, self.front, params)
+
+    def test_ranked_leaderboard(self):
+        ranked = {'board': 'pnl', 'top': [{'wallet': 'player', 'rank': 1, 'score': 1.25}], 'around': []}
+        with mock.patch.object(leaderboards, 'ranked', return_value=ranked):
+            for params in ({'wallet': 'player', 'around': 'x'}, {'board': 'elo'}):
+                self.assertSameResponse(UserViewSet, 'leaderboard', async_views.leaderboard, self.front, params)
+        with mock.patch.object(leaderboards, 'ranked', side_effect=ConnectionError('redis is down')):
+            self.assertSameResponse(UserViewSet, 'leaderboard', async_views.leaderboard, self.front)
+
+def routed_view(request):
+    """Answers with the alias its read went to, after writing on POST."""
+    router = db_router.ReplicaRouter()
+    if request.method == 'POST':
+        router.db_for_write(User)
+    return HttpResponse(router.db_for_read(User))
+
+@override_settings(REPLICA_LAG_CHECK_INTERVAL=0)
+class ReplicaRoutingTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.lag = 0.0
+        for name, patch in (('replica_alias', {'return_value': 'replica'}),
+                            ('replica_lag', {'side_effect': lambda alias: self.lag})):
+            patcher = mock.patch.object(db_router, name, **patch)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.middleware = db_router.ReplicaRoutingMiddleware(routed_view)
+
+    def read_alias(self, path='/api/users/', method='get', session=None, token='front-token'):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        if session is not None:
+            headers['HTTP_X_SESSION_KEY'] = session
+        return self.middleware(getattr(RequestFactory(), method)(path, **headers)).content.decode()
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(self.read_alias(), 'replica')
+        self.assertEqual(self.read_alias(method='post'), 'default')
+        self.assertEqual(self.read_alias('/api/bets/bets_volume/'), 'default')
+
+    def test_writes_pin_only_their_session(self):
+        self.read_alias(method='post', session='wallet-a')
+        self.assertEqual(self.read_alias(session='wallet-a'), 'default')
+        # Same front token, other wallets
+        self.assertEqual(self.read_alias(session='wallet-b'), 'replica')
+        self.assertEqual(self.read_alias(), 'replica')
+        self.assertEqual(self.read_alias(session='wallet-a', token='scrap-token'), 'replica')
+        # Analytical reads tolerate the lag
+        self.assertEqual(self.read_alias('/api/users/top_volume/', session='wallet-a'), 'replica')
+
+    def test_lagging_replica_is_skipped(self):
+        self.lag = settings.REPLICA_MAX_LAG + 1
+        with self.assertLogs(db_router.logger, 'WARNING'):
+            self.assertEqual(self.read_alias(), 'default')
+        self.lag = 0.0
+        self.assertEqual(self.read_alias(), 'replica')
+
+    def test_failed_lag_check_reads_from_the_primary(self):
+        db_router.replica_lag.side_effect = ConnectionError('replica is down')
+        with self.assertLogs(db_router.logger, 'ERROR'):
+            self.assertEqual(self.read_alias(), 'default')
+
+    def test_no_replica_alias(self):
+        db_router.replica_alias.return_value = None
+        self.assertEqual(self.read_alias(), 'default')
+
+class AsyncViewBenchmarkTest(TestCase):
+    def test_benchmark_needs_data(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_async_views', stdout=StringIO())
+
+    def test_benchmark_runs(self):
+        service_user('front')
+        service_user('scrap')
+        red = Fighter.objects.create(name='red')
+        Match.objects.create(red_id=red, blue_id=Fighter.objects.create(name='blue'))
+        User.objects.create(wallet='player')
+        out = StringIO()
+        call_command('benchmark_async_views', concurrency=4, rounds=2, cold=True, stdout=out)
+        for endpoint in ('latest', 'get_volumes', 'expected_wins_data', 'bet_history', 'top_volume', 'top_gain'):
+            self.assertIn(f'{endpoint} sync:', out.getvalue())
+            self.assertIn(f'{endpoint} async:', out.getvalue())
+        self.assertNotIn('error response', out.getvalue())
+
+class ReadThroughTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    async def test_cold_miss_is_computed_once(self):
+        computed = []
+        async def compute():
+            computed.append(1)
+            await asyncio.sleep(0.2)
+            return 'value'
+        results = await asyncio.gather(*(caching.aread_through('key', compute) for _ in range(8)))
+        self.assertEqual(results, ['value'] * 8)
+        self.assertEqual(len(computed), 1)
+
+    async def test_async_waiters_get_the_value_of_the_lock_holder(self):
+        cache.add(caching._lock_key('key'), 1)
+        compute = mock.AsyncMock(return_value='recomputed')
+        waiter = asyncio.ensure_future(caching.aread_through('key', compute))
+        await asyncio.sleep(0.2)
+        self.assertFalse(waiter.done())
+        caching._write('key', 'stored', caching.READ_CACHE_TTL)
+        self.assertEqual(await asyncio.wait_for(waiter, 1), 'stored')
+        compute.assert_not_called()
+
+    def test_sync_cold_miss_never_waits(self):
+        cache.add(caching._lock_key('key'), 1)
+        with mock.patch.object(caching.time, 'sleep') as sleep:
+            self.assertEqual(caching.read_through('key', lambda: 'computed'), 'computed')
+        sleep.assert_not_called()
+        # The lock stays with its holder
+        self.assertIsNotNone(cache.get(caching._lock_key('key')))
+
+    def test_sync_serves_stale_while_locked(self):
+        caching._write('key', 'stale', ttl=-1)
+        cache.add(caching._lock_key('key'), 1)
+        self.assertEqual(caching.read_through('key', lambda: 'computed'), 'stale')
+
+    def test_lock_is_released_when_compute_fails(self):
+        with self.assertRaises(ValueError):
+            caching.read_through('key', mock.Mock(side_effect=ValueError))
+        self.assertIsNone(cache.get(caching._lock_key('key')))
+        self.assertEqual(caching.read_through('key', lambda: 'value'), 'value')
+
+    def test_invalidate_forces_a_recompute(self):
+        caching.read_through('key', lambda: 'old', ttl=60)
+        self.assertEqual(caching.read_through('key', lambda: 'new', ttl=60), 'old')
+        caching.invalidate('key')
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(caching.read_through('key', lambda: 'new', ttl=60), 'new')
+
+    async def test_async_read_shares_the_sync_entries(self):
+        async def compute():
+            return 'value'
+        self.assertEqual(await caching.aread_through('key', compute, ttl=60), 'value')
+        self.assertEqual(caching.read_through('key', lambda: 'other', ttl=60), 'value')
+        self.assertIsNone(cache.get(caching._lock_key('key')))
+
+class FakeRedis:
+    """The commands the ranked boards use, run as they are queued (one client
+    at a time, so WATCH never fails), recording every score sent."""
+
+    def __init__(self):
+        self.boards = {}
+        self.sent = []
+        # Called with the key of every ZADD, to interleave other clients
+        self.on_zadd = None
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def watch(self, *keys):
+        pass
+
+    def multi(self):
+        pass
+
+    def execute(self):
+        pass
+
+    def exists(self, key):
+        return int(key in self.boards)
+
+    def set(self, key, value, ex=None):
+        self.boards[key] = value
+
+    def expire(self, key, seconds):
+        pass
+
+    def delete(self, *keys):
+        for key in keys:
+            self.boards.pop(key, None)
+
+    def rename(self, source, destination):
+        self.boards[destination] = self.boards.pop(source)
+
+    def rpush(self, key, value):
+        self.boards.setdefault(key, []).append(value)
+
+    def lrange(self, key, start, end):
+        return list(self.boards.get(key, []))
+
+    def zadd(self, key, mapping):
+        for member, score in mapping.items():
+            self.sent.append(score)
+            self.boards.setdefault(key, {})[member] = score
+        if self.on_zadd:
+            self.on_zadd(key)
+
+    def zincrby(self, key, amount, member):
+        self.sent.append(amount)
+        board = self.boards.setdefault(key, {})
+        board[member] = board.get(member, 0) + amount
+
+    def score(self, board, wallet):
+        return self.boards.get(leaderboards._board_key(board), {}).get(wallet)
+
+class BrokenRedis:
+    def pipeline(self, transaction=False):
+        raise ConnectionError('redis is down')
+
+class RankedBoardsTest(SimpleTestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = mock.patch.object(leaderboards, '_redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_scores_are_sent_as_integers(self):
+        leaderboards.increment_scores({'w1': {'volume': Decimal('1500000000'), 'pnl': Decimal('-2')}})
+        leaderboards.set_scores({'w2': {'volume': Decimal('3'), 'pnl': Decimal('2')}})
+        self.assertTrue(all(type(score) is int for score in self.redis.sent))
+        self.assertEqual(self.redis.score('volume', 'w1'), 1_500_000_000)
+        self.assertEqual(self.redis.score('pnl', 'w2'), 2)
+
+    def test_failed_update_schedules_a_rebuild(self):
+        with mock.patch.object(leaderboards, '_redis', return_value=BrokenRedis()), \
+                mock.patch.object(leaderboards, 'schedule_rebuild') as schedule_rebuild, \
+                self.assertLogs(leaderboards.logger, 'ERROR'):
+            leaderboards.increment_scores({'w1': {'volume': 1}})
+            leaderboards.set_scores({'w1': {'volume': 1}})
+        self.assertEqual(schedule_rebuild.call_count, 2)
+
+    def test_scheduled_rebuilds_are_coalesced(self):
+        with mock.patch.object(leaderboards.threading, 'Timer') as timer:
+            leaderboards.schedule_rebuild()
+            leaderboards.schedule_rebuild()
+            self.assertEqual(timer.call_count, 1)
+            with mock.patch.object(leaderboards, 'rebuild_ranked_boards', return_value=0):
+                leaderboards._scheduled_rebuild()
+            leaderboards.schedule_rebuild()
+            self.assertEqual(timer.call_count, 2)
+        leaderboards._rebuild_timer = None
+
+class RankedBoardsRebuildTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create(wallet='player', total_volume=5, total_gain=2)
+        User.objects.create(wallet='referrer', referral_gain=1)
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = mock.patch.object(leaderboards, '_redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def payout_during_rebuild(self, key):
+        # A payout committed after the rebuild read the totals
+        if key.endswith(':rebuild') and self.redis.on_zadd:
+            self.redis.on_zadd = None
+            leaderboards.increment_scores({'player': {'volume': 3}})
+            leaderboards.set_scores({'referrer': {'referral_gain': 4}})
+
+    def assertReleased(self):
+        self.assertFalse(self.redis.exists(leaderboards.REBUILD_LOCK_KEY))
+        self.assertFalse(self.redis.exists(leaderboards.PENDING_KEY))
+
+    def test_updates_during_a_rebuild_are_replayed(self):
+        self.redis.on_zadd = self.payout_during_rebuild
+        self.assertEqual(leaderboards.rebuild_ranked_boards(), 2)
+        self.assertEqual(self.redis.score('volume', 'player'), 8)
+        self.assertEqual(self.redis.score('gain', 'player'), 2)
+        self.assertEqual(self.redis.score('referral_gain', 'referrer'), 4)
+        self.assertReleased()
+
+    def test_failed_rebuild_keeps_the_boards_and_the_updates(self):
+        leaderboards.set_scores({'player': {'volume': 5}})
+        def fail(key):
+            self.payout_during_rebuild(key)
+            raise ConnectionError('redis is down')
+        self.redis.on_zadd = fail
+        with self.assertRaises(ConnectionError):
+            leaderboards.rebuild_ranked_boards()
+        self.assertEqual(self.redis.score('volume', 'player'), 8)
+        self.assertFalse(self.redis.exists(leaderboards._board_key('volume') + ':rebuild'))
+        self.assertReleased()
+
+    def test_one_rebuild_at_a_time(self):
+        self.redis.set(leaderboards.REBUILD_LOCK_KEY, 1)
+        self.assertIsNone(leaderboards.rebuild_ranked_boards())
+
+    def test_command_survives_a_redis_outage(self):
+        err = StringIO()
+        with mock.patch.object(leaderboards, '_redis', return_value=BrokenRedis()), \
+                self.assertLogs('datalog.management.commands.rebuild_leaderboards', 'ERROR'):
+            call_command('rebuild_leaderboards', stdout=StringIO(), stderr=err)
+        self.assertIn('redis is down', err.getvalue())
+
+class UserPayoutTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.scrap = service_user('scrap')
+        red = Fighter.objects.create(name='red')
+        match = Match.objects.create(red_id=red, blue_id=Fighter.objects.create(name='blue'))
+        cls.player = User.objects.create(wallet='player')
+        cls.referrer = User.objects.create(wallet='referrer')
+        cls.bets = [
+            Bet.objects.create(m_id=match, u_id=cls.player, f_id=red, tx_in='', success_in=True, volume=to_lamports(volume))
+            for volume in ('1', '2')
+        ]
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = mock.patch.object(leaderboards, '_redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_payout(self):
+        payload = [
+            {'user_address': 'player', 'bet_id': str(self.bets[0].b_id), 'payout': 2.5, 'invalid_match': False,
+             'referrer_address': 'referrer', 'referrer_royalty': 0.01},
+            {'user_address': 'player', 'bet_id': str(self.bets[1].b_id), 'payout': 0, 'invalid_match': False},
+            {'user_address': 'ghost', 'bet_id': str(self.bets[0].b_id), 'payout': 1, 'invalid_match': False},
+        ]
+        with self.captureOnCommitCallbacks(execute=True), self.assertLogs('datalog.views', 'WARNING') as logs:
+            response = put(UserViewSet, 'user_payout', payload, self.scrap)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('User not found: ghost', logs.output[0])
+
+        player = User.objects.get(pk=self.player.pk)
+        self.assertEqual((player.total_volume, player.total_gain, player.pnl), (to_lamports(3), to_lamports('2.5'), to_lamports('-0.5')))
+        self.assertEqual(User.objects.get(pk=self.referrer.pk).referral_gain, to_lamports('0.01'))
+        # The boards get the same amounts as the rows, pnl included
+        self.assertEqual(self.redis.score('volume', 'player'), player.total_volume)
+        self.assertEqual(self.redis.score('gain', 'player'), player.total_gain)
+        self.assertEqual(self.redis.score('pnl', 'player'), player.pnl)
+        self.assertEqual(self.redis.score('referral_gain', 'referrer'), to_lamports('0.01'))
+
+class RecomputeTotalsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        red = Fighter.objects.create(name='red')
+        match = Match.objects.create(red_id=red, blue_id=Fighter.objects.create(name='blue'))
+        # Stale stored totals, as left by a missed payout
+        cls.user = User.objects.create(wallet='player', total_volume=to_lamports(7), total_gain=to_lamports(9), referral_gain=5)
+        for volume, payout, valid in (('1', '3', True), ('2', '0', True), ('4', '4', None)):
+            Bet.objects.create(
+                m_id=match, u_id=cls.user, f_id=red, tx_in='', success_in=True, success_out=payout != '0',
+                invalid_match=not valid, volume=to_lamports(volume), payout=to_lamports(payout),
+            )
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = mock.patch.object(leaderboards, '_redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_recompute_updates_row_and_scores(self):
+        mark_totals_dirty([self.user.pk])
+        self.assertEqual(recompute_user_totals(dirty_only=True), 1)
+
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual((user.total_volume, user.total_gain, user.total_payout), (to_lamports(3), to_lamports(3), to_lamports(7)))
+        self.assertEqual(user.pnl, 0)
+        self.assertFalse(user.totals_dirty)
+        # The pnl sent is the recomputed one, not the stale value read under the lock
+        self.assertEqual(self.redis.score('pnl', 'player'), 0)
+        self.assertEqual(self.redis.score('volume', 'player'), user.total_volume)
+        self.assertEqual(self.redis.score('gain', 'player'), user.total_gain)
+        self.assertEqual(self.redis.score('referral_gain', 'player'), 5)
+
+@skipUnless(connection.vendor == 'postgresql', 'query plans are checked on PostgreSQL')
+class BetIndexPlanTest(TestCase):
+    """The hot bet queries are served by the composite indexes leading with their foreign key."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(wallet='player')
+        cls.fighter = Fighter.objects.create(name='red')
+        cls.match = Match.objects.create(red_id=cls.fighter, blue_id=Fighter.objects.create(name='blue'))
+
+    def assertUses(self, queryset, index, index_only=False):
+        plan = explain(queryset)
+        self.assertIn(index, plan)
+        self.assertNotIn('Seq Scan', plan)
+        if index_only:
+            self.assertIn('Index Only Scan', plan)
+
+    def test_match_volumes(self):
+        bets = Bet.objects.filter(m_id=self.match, success_in=True, team='red').values('team').annotate(Sum('volume'))
+        self.assertUses(bets, 'bet_match_team_idx', index_only=True)
+
+    def test_match_validity(self):
+        self.assertUses(Bet.objects.filter(m_id=self.match, invalid_match=True).values('m_id'), 'bet_match_valid_idx', index_only=True)
+        valid = Bet.objects.filter(m_id=self.match, invalid_match=False).values('team').annotate(Sum('volume'))
+        self.assertRegex(explain(valid), r'bet_match_(valid|team)_idx')
+
+    def test_fighter_bet_count(self):
+        bets = Bet.objects.filter(f_id=self.fighter, invalid_match=False).values('f_id')
+        self.assertUses(bets, 'bet_fighter_valid_idx', index_only=True)
+
+    def test_user_history(self):
+        bets = Bet.objects.filter(u_id__wallet='player', success_in=True).order_by('-creation_date').values(*BET_HISTORY_VALUES)[:10]
+        self.assertUses(bets, 'bet_user_history_idx')
+
+    def test_user_totals(self):
+        bets = Bet.objects.filter(u_id__in=[self.user.pk]).values('u_id').annotate(Sum('volume'), Sum('payout'))
+        self.assertUses(bets, 'bet_user_history_idx')
+
+class RevocationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        authentication._revoked.clear()
+        self.front, self.scrap = service_user('front'), service_user('scrap')
+
+    def access(self, user):
+        return authentication.RoleTokenObtainPairSerializer.get_token(user).access_token
+
+    def authenticate(self, token):
+        return authentication.ServiceTokenAuthentication().get_user(token)
+
+    def test_revocations_are_kept_per_user(self):
+        front_token, scrap_token = self.access(self.front), self.access(self.scrap)
+        self.assertEqual(self.authenticate(front_token).role, 'front')
+        authentication.revoke_user(self.front.pk)
+        authentication.revoke_user(self.scrap.pk)
+        # The second revocation does not overwrite the first one
+        for token in (front_token, scrap_token):
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate(token)
+
+    def test_tokens_issued_after_the_revocation_are_accepted(self):
+        authentication.revoke_user(self.front.pk)
+        token = self.access(self.front)
+        token['iat'] = authentication.revoked_at(self.front.pk) + 1
+        self.assertEqual(self.authenticate(token).role, 'front')
+        self.assertEqual(self.authenticate(self.access(self.scrap)).role, 'scrap')
+
+    def test_cache_outage_does_not_block_user_changes(self):
+        broken = mock.Mock(**{'set.side_effect': ConnectionError('redis is down')})
+        with mock.patch.object(authentication, 'cache', broken), \
+                self.assertLogs(authentication.logger, 'ERROR') as logs:
+            self.scrap.is_active = False
+            self.scrap.save()
+            self.front.delete()
+        self.assertEqual(len(logs.output), 2)
+        self.assertFalse(get_user_model().objects.filter(username='front').exists())
+
+@skipUnless(connection.vendor == 'postgresql' and connection.settings_dict['OPTIONS'].get('pool'), 'needs the PostgreSQL pool')
+class ConnectionPoolLoadTest(TransactionTestCase):
+    """More concurrent queries than the pool holds never open more connections."""
+
+    def query(self, index):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_sleep(0.05)')
+        finally:
+            # Returns the connection to the pool, as the end of a request does
+            connection.close()
+
+    def backends(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()')
+            return cursor.fetchone()[0]
+
+    def test_connections_stay_bounded(self):
+        max_size = connection.pool.max_size
+        before = pool_metrics()['default']
+        peak_backends = peak_size = 0
+        with ThreadPoolExecutor(max_workers=max_size * 3) as executor:
+            queries = [executor.submit(self.query, index) for index in range(max_size * 10)]
+            while not all(query.done() for query in queries):
+                peak_backends = max(peak_backends, self.backends())
+                peak_size = max(peak_size, pool_metrics()['default']['size'])
+                time.sleep(0.01)
+        for query in queries:
+            query.result()
+        after = pool_metrics()['default']
+        self.assertLessEqual(peak_size, max_size)
+        self.assertLessEqual(peak_backends, max_size)
+        # The load did exceed the pool: some checkouts had to wait, none timed out
+        self.assertGreater(after['queued'], before['queued'])
+        self.assertEqual(after['timeouts'], before['timeouts'])
 
-# Create your tests here.
\ No newline at end of file
@@ -0,0 +1,72 @@
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from datalog.models import Bet, User
+from datalog.caching import invalidate_user_stats
+from datalog import leaderboards
+
+TOTALS_BATCH_SIZE = 1000
+TOTALS_FIELDS = ['total_volume', 'total_payout', 'total_gain', 'nb_bet', 'totals_dirty']
+
+def mark_totals_dirty(u_ids):
+    """Flag users whose bets changed so the next incremental run picks them up."""
+    if u_ids:
+        User.objects.filter(u_id__in=u_ids, totals_dirty=False).update(totals_dirty=True)
+
+def _aggregate_totals(u_ids):
+    valid = Q(invalid_match=False, success_in=True)
+    rows = Bet.objects.filter(u_id__in=u_ids).values('u_id').annotate(
+        total_volume=Coalesce(Sum('volume', filter=valid), 0),
+        total_payout=Coalesce(Sum('payout', filter=Q(success_out=True)), 0),
+        total_gain=Coalesce(Sum('payout', filter=Q(invalid_match=False, success_out=True)), 0),
+        nb_bet=Count('m_id', filter=valid, distinct=True),
+    ).order_by()
+    return {row['u_id']: row for row in rows}
+
+def _recompute_batch(u_ids):
+    with transaction.atomic():
+        # Same lock order as user_payout, so the two never deadlock
+        users = list(User.objects.select_for_update().filter(u_id__in=u_ids).order_by('u_id'))
+        totals = _aggregate_totals(u_ids)
+        scores = {}
+        for user in users:
+            row = totals.get(user.u_id, {})
+            user.total_volume = row.get('total_volume', 0)
+            user.total_payout = row.get('total_payout', 0)
+            user.total_gain = row.get('total_gain', 0)
+            user.nb_bet = row.get('nb_bet', 0)
+            user.totals_dirty = False
+            # user.pnl is generated by Postgres and still holds the value read above
+            scores[user.wallet] = {
+                'volume': user.total_volume,
+                'gain': user.total_gain,
+                'pnl': user.total_gain - user.total_volume,
+                'referral_gain': user.referral_gain,
+            }
+        User.objects.bulk_update(users, TOTALS_FIELDS)
+    leaderboards.set_scores(scores)
+    invalidate_user_stats(user.u_id for user in users)
+    return len(users)
+
+def recompute_user_totals(u_ids=None, dirty_only=False, batch_size=TOTALS_BATCH_SIZE):
+    """Recompute the stored betting totals from the bets, one GROUP BY per batch.
+
+    Recomputes `u_ids`, or every user (only the dirty ones with `dirty_only`).
+    Each batch commits on its own so live payouts are never blocked for long.
+    Returns the number of users updated.
+    """
+    users = User.objects.order_by('u_id')
+    if u_ids is not None:
+        users = users.filter(u_id__in=u_ids)
+    if dirty_only:
+        users = users.filter(totals_dirty=True)
+
+    updated = 0
+    last = None
+    while True:
+        batch = users.filter(u_id__gt=last) if last is not None else users
+        batch = list(batch.values_list('u_id', flat=True)[:batch_size])
+        if not batch:
+            return updated
+        updated += _recompute_batch(batch)
+        last = batch[-1]
@@ -1,53 +1,114 @@
-from django.db.models import Q, Sum, Count
-from django.http import JsonResponse
+from django.db.models import Sum
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, mixins
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.shortcuts import get_object_or_404
 from datetime import timedelta
 from rest_framework.decorators import action
 from datalog.models import User, Match, Bet, Fighter, Global
-from datalog.serializers import UserSerializer, MatchSerializer, BetSerializer, FighterSerializer, GlobalSerializer
+from datalog.fields import signature_bytes
+from datalog.serializers import UserSerializer, MatchSerializer, BetSerializer, FighterSerializer, GlobalSerializer, to_lamports, to_sol
+from datalog.serializers import MATCH_VALUES, FIGHTER_VALUES, VOLUMES_VALUES, BET_HISTORY_VALUES
+from datalog.serializers import match_values, fighter_values, volumes_values, bet_history_values
 from rest_framework.response import Response
-from rest_framework import status, permissions
-from .permissions import ReadOnlyForGrafanaPermission
+from rest_framework import status
+from django_filters.rest_framework import DjangoFilterBackend
+from .permissions import IsFront, IsScrap, IsStats, IsFrontOrScrap
+from .filters import UserFilter, MatchFilter, BetFilter, FighterFilter, GlobalFilter
+from .pagination import KeysetPagination
+from backend.encoders import dumps
+from .volumes import update_match_counters, schedule_volume_broadcast
+from .totals import recompute_user_totals, mark_totals_dirty
+from .caching import get_stats_snapshot, refresh_stats_snapshot, get_user_stats, invalidate_user_stats
+from .caching import read_through, invalidate, invalidate_match, match_key, match_volumes_key, read_cache_metrics, CURRENT_MATCH_KEY
+from .pool import pool_metrics
+from . import leaderboards
 from django.db import transaction
-from decimal import Decimal
-from django.core.exceptions import PermissionDenied, ObjectDoesNotExist, ValidationError
-import json
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
+# Rows per UPDATE ... CASE statement issued by bulk_update
+BULK_UPDATE_BATCH_SIZE = 500
+
 class NoBetsFoundException(ObjectDoesNotExist):
     pass
 
 class BaseViewSet(viewsets.ModelViewSet):
-    def get_queryset(self):
-        if self.request.user.username.strip() not in ['scrap', 'front']:
-            raise PermissionDenied("API permission denied")
-        queryset = self.queryset
-        query_params = self.request.query_params
-        if query_params:
-            filters = Q()
-            for key, value in query_params.items():
-                if hasattr(self.queryset.model, key):
-                    filters |= Q(**{f"{key}__icontains": value})
-            queryset = queryset.filter(filters)
-        return queryset
+    filter_backends = [DjangoFilterBackend]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('creation_date', 'pk')
+    permission_classes = [IsFrontOrScrap]
+    # Permissions of the standard routes that differ from permission_classes
+    action_permission_classes = {}
+    # Optional .values() read path for list: projected fields and row builder
+    values_fields = None
+    values_row = None
+
+    def get_permissions(self):
+        permission_classes = self.action_permission_classes.get(self.action, self.permission_classes)
+        return [permission() for permission in permission_classes]
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('stream') == 'ndjson':
+            return self.stream_ndjson(self.filter_queryset(self.get_queryset()))
+        if self.values_row is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset()).values(*self.values_fields)
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response([self.values_row(row) for row in page])
+
+    def stream_ndjson(self, queryset):
+        """Stream every matching row as one JSON document per line.
+
+        Rows come from a server-side cursor in chunks of NDJSON_CHUNK_SIZE, so
+        memory stays flat however large the table is. Viewsets with a
+        .values() read path build each line on the event loop; the others
+        serialize each chunk on a worker thread, as DRF serializers are sync.
+        """
+        chunk_size = settings.NDJSON_CHUNK_SIZE
+        # The body is iterated after the routing middleware has returned: the
+        # database is picked now, while the request's routing state is set
+        queryset = queryset.order_by(*[f'-{name}' for name in self.cursor_ordering]).using(queryset.db)
+
+        if self.values_row is not None:
+            values_row = self.values_row
+
+            async def rows():
+                async for row in queryset.values(*self.values_fields).aiterator(chunk_size=chunk_size):
+                    yield dumps(values_row(row)) + b'\n'
+        else:
+            serializer_class = self.get_serializer_class()
+            context = self.get_serializer_context()
 
-from django.db import transaction
+            @sync_to_async(thread_sensitive=False)
+            def encode(instances):
+                return b''.join(dumps(data) + b'\n' for data in serializer_class(instances, many=True, context=context).data)
+
+            async def rows():
+                chunk = []
+                async for instance in queryset.aiterator(chunk_size=chunk_size):
+                    chunk.append(instance)
+                    if len(chunk) == chunk_size:
+                        yield await encode(chunk)
+                        chunk = []
+                if chunk:
+                    yield await encode(chunk)
+
+        return StreamingHttpResponse(rows(), content_type='application/x-ndjson')
 
 class UserViewSet(BaseViewSet, mixins.UpdateModelMixin):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    filterset_class = UserFilter
     lookup_field = 'u_id'
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
+    action_permission_classes = {'create': [IsFront]}
     
     def create(self, request, *args, **kwargs):
-        if request.user.username.strip() != 'front':
-            raise PermissionDenied("API permission denied")
         wallet = request.data.get('wallet')
         if not wallet:
             return Response({'error': 'Wallet address is required'}, status=status.HTTP_400_BAD_REQUEST)
@@ -59,10 +120,8 @@ class UserViewSet(BaseViewSet, mixins.UpdateModelMixin):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], permission_classes=[IsFront])
     def get_user_by_wallet(self, request): #to_remove
-        if request.user.username.strip() != 'front':
-            raise PermissionDenied("API permission denied")
         wallet = request.query_params.get('wallet')
         if not wallet:
             return Response({'error': 'Wallet is required'}, status=status.HTTP_400_BAD_REQUEST)
@@ -77,20 +136,16 @@ class UserViewSet(BaseViewSet, mixins.UpdateModelMixin):
             return User.objects.get(wallet=wallet)
         except User.DoesNotExist:
             return None
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], permission_classes=[IsFront])
     def check_ref_code(self, request):
-        if request.user.username.strip() != 'front':
-            raise PermissionDenied("API permission denied")
         ref_code = request.query_params.get('ref_code')
         if not ref_code:
             return Response({'error': 'Referral code is required'}, status=status.HTTP_400_BAD_REQUEST)
         exists = User.objects.filter(ref_code=ref_code).exists()
         return Response({'exists': exists})
 
-    @action(detail=True, methods=['put'])
+    @action(detail=True, methods=['put'], permission_classes=[IsFront])
     def update_ref_code(self, request, u_id=None):
-        if request.user.username.strip() != 'front':
-            raise PermissionDenied("API permission denied")
         ref_code = request.data.get('ref_code')
         if not ref_code:
             return Response({'error': 'ref_code is required'}, status=status.HTTP_400_BAD_REQUEST)
@@ -108,10 +163,8 @@ class UserViewSet(BaseViewSet, mixins.UpdateModelMixin):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    @action(detail=False, methods=['put'])
+    @action(detail=False, methods=['put'], permission_classes=[IsFront])
     def update_referrer(self, request):
-        if request.user.username.strip() != 'front':
-            raise PermissionDenied("API permission denied")
         wallet = request.data.get('wallet')
         ref_code = request.data.get('ref_code')
         if not wallet or not ref_code:
@@ -133,10 +186,8 @@ class UserViewSet(BaseViewSet, mixins.UpdateModelMixin):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], permission_classes=[IsFront])
     def get_referrer_wallet(self, request):
-        if request.user.username.strip() != 'front':
-            raise PermissionDenied("API permission denied")
         ref_id = request.query_params.get('ref_id')
         if not ref_id:
             return Response({'error': 'ref_id is required'}, status=status.HTTP_400_BAD_REQUEST)
@@ -146,88 +197,50 @@ class UserViewSet(BaseViewSet, mixins.UpdateModelMixin):
         except User.DoesNotExist:
             return Response({'error': 'Referrer not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], permission_classes=[IsFront])
     def top_volume(self, request):
-        if request.user.username.strip() != 'front':
-            raise PermissionDenied("API permission denied")
         
-        users = User.objects.filter(total_volume__gt=0).order_by('-total_volume')[:10]
-        data = [{
-            'wallet': user.wallet, 
-            'volume': float(user.total_volume)
-        } for user in users]
-        return Response(data)
+        limit = self.get_leaderboard_limit(request)
+        return Response(leaderboards.top_volume(limit))
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], permission_classes=[IsFront])
     def top_gain(self, request):
-        if request.user.username.strip() != 'front':
-            raise PermissionDenied("API permission denied")
-        
-        users = User.objects.all()
-        data = [{
-            'wallet': user.wallet,
-            'volume': float(user.total_volume),
-            'gain': float(user.total_gain),
-            'pnl': float(user.total_gain - user.total_volume)
-        } for user in users]
         
-        # Filtrer et trier par PnL
-        data = sorted(data, key=lambda x: x['pnl'], reverse=True)[:10]
-        return Response(data)
+        limit = self.get_leaderboard_limit(request)
+        window = request.query_params.get('window', 'all')
+        if window not in leaderboards.LEADERBOARD_WINDOWS:
+            return Response({'error': f"window must be one of {', '.join(leaderboards.LEADERBOARD_WINDOWS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(leaderboards.top_gain(limit, window))
+
+    def get_leaderboard_limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 10
+        return max(1, min(limit, leaderboards.LEADERBOARD_MAX_LIMIT))
+
+    @action(detail=False, methods=['get'], permission_classes=[IsFront])
+    def leaderboard(self, request):
+
+        board = request.query_params.get('board', 'pnl')
+        if board not in leaderboards.RANKED_BOARDS:
+            return Response({'error': f"board must be one of {', '.join(leaderboards.RANKED_BOARDS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = self.get_leaderboard_limit(request)
+        try:
+            around = max(0, min(int(request.query_params.get('around', 2)), 10))
+        except ValueError:
+            around = 2
+        try:
+            return Response(leaderboards.ranked(board, limit, request.query_params.get('wallet'), around))
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-    @action(detail=True, methods=['get'])
+    @action(detail=True, methods=['get'], permission_classes=[IsFront])
     def stats(self, request, u_id=None):
-        if request.user.username.strip() != 'front':
-            raise PermissionDenied("API permission denied")
-        user = self.get_object()
-        
-        # Calcul du volume total (paris valides uniquement)
-        total_volume = Bet.objects.filter(
-            u_id=user,
-            invalid_match=False,
-            success_in=True
-        ).aggregate(Sum('volume'))['volume__sum'] or 0
-
-        # Calcul des gains (payouts des matchs valides)
-        total_gain = Bet.objects.filter(
-            u_id=user,
-            invalid_match=False,  # Seulement les matchs valides
-            success_out=True      # Paiements réussis
-        ).aggregate(Sum('payout'))['payout__sum'] or 0
-
-        # Calcul du total des payouts (gains + remboursements)
-        total_payout = Bet.objects.filter(
-            u_id=user,
-            success_out=True  # Tous les payouts réussis
-        ).aggregate(Sum('payout'))['payout__sum'] or 0
-
-        # Nombre de paris et paris gagnants
-        valid_bets = Bet.objects.filter(
-            u_id=user,
-            invalid_match=False,
-            success_in=True
-        )
-        
-        total_bets = valid_bets.count()
-        winning_bets = valid_bets.filter(payout__gt=0).count()
-        
-        win_percentage = (winning_bets / total_bets * 100) if total_bets > 0 else 0
-        
-        stats = {
-            'volume': float(total_volume),
-            'total_volume': float(user.total_volume),
-            'gain': float(total_gain),
-            'nbBets': total_bets,
-            'winningBets': winning_bets,
-            'winPercentage': round(win_percentage, 2),
-            'referral_gain': float(user.referral_gain) if user.referral_gain is not None else 0.0
-        }
-        return Response(stats)
-
-    @action(detail=False, methods=['get'])
+        return Response(get_user_stats(u_id, self.get_object))
+
+    @action(detail=False, methods=['get'], permission_classes=[IsFront])
     def actual_wins_data(self, request):
-        if request.user.username.strip() != 'front':
-            raise PermissionDenied("API permission denied")
         
         m_id = request.query_params.get('m_id')
         wallet = request.query_params.get('wallet')
@@ -268,7 +281,7 @@ class UserViewSet(BaseViewSet, mixins.UpdateModelMixin):
             tx_out = bets_query.values_list('tx_out', flat=True).first()
             
             response_data = {
-                'totalPayout': float(total_payout),
+                'totalPayout': to_sol(total_payout),
                 'tx_out': tx_out,
                 'invalidMatch': invalid_match,
                 'status': 'completed',
@@ -287,14 +300,16 @@ class UserViewSet(BaseViewSet, mixins.UpdateModelMixin):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-    @action(detail=False, methods=['put'])
+    @action(detail=False, methods=['put'], permission_classes=[IsScrap])
     def user_payout(self, request):
-        if request.user.username.strip() != 'scrap':
-            raise PermissionDenied("API permission denied")
         data = request.data
         
         try:
             with transaction.atomic():
+                # Incréments des classements Redis, appliqués après le commit
+                ranked_deltas = {}
+                touched_users = set()
+
                 # Grouper les paris par utilisateur
                 user_bets = {}
                 for bet_data in data:
@@ -303,69 +318,94 @@ class UserViewSet(BaseViewSet, mixins.UpdateModelMixin):
                         user_bets[user_address] = []
                     user_bets[user_address].append(bet_data)
 
+                # Verrouiller joueurs et parrains en une requête, toujours dans
+                # l'ordre des u_id pour éviter les deadlocks entre appels concurrents
+                wallets = set(user_bets)
+                wallets.update(bet_data['referrer_address'] for bet_data in data if bet_data.get('referrer_address'))
+                users = {
+                    user.wallet: user
+                    for user in User.objects.select_for_update().filter(wallet__in=wallets).order_by('u_id')
+                }
+
+                bet_ids = set()
+                for bet_data in data:
+                    try:
+                        bet_ids.add(uuid.UUID(str(bet_data['bet_id'])))
+                    except ValueError:
+                        pass
+                volumes = dict(Bet.objects.filter(b_id__in=bet_ids).values_list('b_id', 'volume'))
+
+                changed = {}
                 for user_address, bets in user_bets.items():
+                    user = users.get(user_address)
+                    if user is None:
+                        logger.warning(f"User not found: {user_address}")
+                        continue
                     try:
-                        user = User.objects.select_for_update().get(wallet=user_address)
-                        
-                        total_volume = Decimal('0')
-                        total_gain = Decimal('0')
-                        total_payout = Decimal('0')
+                        total_volume = 0
+                        total_gain = 0
+                        total_payout = 0
+                        royalties = {}
 
                         for bet_data in bets:
-                            bet = Bet.objects.select_for_update().get(b_id=bet_data['bet_id'])
-                            payout = Decimal(str(bet_data['payout']))
-                            
+                            try:
+                                volume = volumes[uuid.UUID(str(bet_data['bet_id']))]
+                            except (KeyError, ValueError):
+                                logger.warning(f"Bet not found in bet_data: {bet_data}")
+                                continue
+                            payout = to_lamports(bet_data['payout'])
+
                             # Traiter les gains de parrainage
                             if bet_data.get('referrer_address'):
-                                try:
-                                    referrer = User.objects.select_for_update().get(
-                                        wallet=bet_data['referrer_address']
-                                    )
-                                    royalty = Decimal(str(bet_data['referrer_royalty']))
-                                    referrer.referral_gain += royalty
-                                    referrer.save()
-                                    
-                                    #print(f"Referral gain processed for {bet_data['referrer_address']}: +{royalty} SOL")
-                                except User.DoesNotExist:
-                                    #print(f"Referrer not found: {bet_data['referrer_address']}")
+                                if bet_data['referrer_address'] not in users:
+                                    logger.debug(f"Referrer not found: {bet_data['referrer_address']}")
                                     continue
+                                royalty = to_lamports(bet_data['referrer_royalty'])
+                                royalties[bet_data['referrer_address']] = royalties.get(bet_data['referrer_address'], 0) + royalty
 
                             if not bet_data['invalid_match']:
-                                total_volume += bet.volume
+                                total_volume += volume
                                 total_gain += payout
                             total_payout += payout
-
-                        #print(f"Processing user {user_address}:")
-                        #print(f"- Volume: +{total_volume} SOL")
-                        #print(f"- Gain: +{total_gain} SOL")
-                        #print(f"- Payout: +{total_payout} SOL")
-
-                        # Mise à jour des totaux de l'utilisateur
-                        user.total_volume += total_volume
-                        user.total_gain += total_gain
-                        user.total_payout += total_payout
-                        user.save()
-
-                    except User.DoesNotExist:
-                        print(f"User not found: {user_address}")
-                        continue
-                    except Bet.DoesNotExist:
-                        print(f"Bet not found in bet_data: {bet_data}")
-                        continue
                     except Exception as e:
-                        print(f"Error processing user {user_address}: {str(e)}")
+                        logger.error(f"Error processing user {user_address}: {str(e)}")
                         continue
 
+                    for referrer_address, royalty in royalties.items():
+                        referrer = users[referrer_address]
+                        referrer.referral_gain += royalty
+                        changed[referrer.u_id] = referrer
+                        deltas = ranked_deltas.setdefault(referrer.wallet, {})
+                        deltas['referral_gain'] = deltas.get('referral_gain', 0) + royalty
+
+                    # Mise à jour des totaux de l'utilisateur
+                    user.total_volume += total_volume
+                    user.total_gain += total_gain
+                    user.total_payout += total_payout
+                    changed[user.u_id] = user
+                    deltas = ranked_deltas.setdefault(user.wallet, {})
+                    deltas['volume'] = deltas.get('volume', 0) + total_volume
+                    deltas['gain'] = deltas.get('gain', 0) + total_gain
+                    deltas['pnl'] = deltas.get('pnl', 0) + total_gain - total_volume
+
+                User.objects.bulk_update(
+                    changed.values(),
+                    ['total_volume', 'total_gain', 'total_payout', 'referral_gain']
+                )
+                touched_users.update(changed)
+
+                transaction.on_commit(lambda: leaderboards.increment_scores(ranked_deltas))
+                transaction.on_commit(lambda: invalidate_user_stats(touched_users))
                 return Response({
                     "message": "User payouts processed successfully"
                 }, status=status.HTTP_200_OK)
                     
         except Exception as e:
-            print(f"Global error in user_payout: {str(e)}")
+            logger.error(f"Global error in user_payout: {str(e)}")
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def expected_wins_data(self, request):
         m_id = request.query_params.get('m_id')
         wallet = request.query_params.get('wallet')
@@ -376,52 +416,20 @@ class UserViewSet(BaseViewSet, mixins.UpdateModelMixin):
             red_bets = Bet.objects.filter(m_id__m_id=m_id, u_id=user, team='red').aggregate(Sum('volume'))
             blue_bets = Bet.objects.filter(m_id__m_id=m_id, u_id=user, team='blue').aggregate(Sum('volume'))
             response_data = {
-                'userRedVolume': float(red_bets['volume__sum'] or 0),
-                'userBlueVolume': float(blue_bets['volume__sum'] or 0)
+                'userRedVolume': to_sol(red_bets['volume__sum']),
+                'userBlueVolume': to_sol(blue_bets['volume__sum'])
             }
             return Response(response_data)
         except User.DoesNotExist:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
         
-    @action(detail=False, methods=['put'])
+    @action(detail=False, methods=['put'], permission_classes=[IsScrap])
     def user_totals(self, request):
-        if request.user.username.strip() != 'scrap':
-            raise PermissionDenied("API permission denied")
         
+        incremental = request.query_params.get('incremental', '').lower() in ('1', 'true')
         try:
-            with transaction.atomic():
-                users = User.objects.all().order_by('creation_date')
-                for user in users:
-                    total_volume = Bet.objects.filter(
-                        u_id=user,
-                        invalid_match=False,
-                        success_in=True
-                    ).aggregate(Sum('volume'))['volume__sum'] or 0
-
-                    total_payout = Bet.objects.filter(
-                        u_id=user,
-                        success_out=True
-                    ).aggregate(Sum('payout'))['payout__sum'] or 0
-
-                    nb_bet = Bet.objects.filter(
-                        u_id=user,
-                        invalid_match=False,
-                        success_in=True
-                    ).values('m_id').distinct().count()
-
-                    total_gain = Bet.objects.filter(
-                    u_id=user,
-                    invalid_match=False,  # Seulement les matchs valides
-                    success_out=True      # Paiements réussis
-                    ).aggregate(Sum('payout'))['payout__sum'] or 0
-
-                    user.total_volume = total_volume
-                    user.total_payout = total_payout
-                    user.total_gain = total_gain
-                    user.nb_bet = nb_bet
-                    user.save()
-
-                return Response({"message": "User totals recalculated successfully"}, status=status.HTTP_200_OK)
+            recompute_user_totals(dirty_only=incremental)
+            return Response({"message": "User totals recalculated successfully"}, status=status.HTTP_200_OK)
                 
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -433,13 +441,11 @@ class UserViewSet(BaseViewSet, mixins.UpdateModelMixin):
 class MatchViewSet(BaseViewSet, mixins.UpdateModelMixin):
     queryset = Match.objects.all()
     serializer_class = MatchSerializer
+    filterset_class = MatchFilter
     lookup_field = 'm_id'
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
+    action_permission_classes = {'create': [IsScrap]}
 
     def create(self, request, *args, **kwargs):
-        if request.user.username.strip() != 'scrap':
-            raise PermissionDenied("API permission denied")
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         match = Match.objects.create(
@@ -447,13 +453,12 @@ class MatchViewSet(BaseViewSet, mixins.UpdateModelMixin):
             blue_id=serializer.validated_data['blue_id'],
             duration=timedelta(seconds=0)
         )
+        invalidate(CURRENT_MATCH_KEY)
         serialized_match = self.get_serializer(match)
         return Response(serialized_match.data, status=status.HTTP_201_CREATED)
 
-    @action(detail=False, methods=['put'])
+    @action(detail=False, methods=['put'], permission_classes=[IsScrap])
     def update_match(self, request):
-        if self.request.user.username.strip() not in ['scrap']:
-            raise PermissionDenied("API permission denied")
         match_id = request.data.get('match')
         winner_id = request.data.get('winner')
         duration_str = request.data.get('duration')
@@ -477,44 +482,51 @@ class MatchViewSet(BaseViewSet, mixins.UpdateModelMixin):
             elif volume['team'] == 'red':
                 match.vol_red = volume['total_volume'] or 0
         match.save()
+        invalidate_match(match.m_id)
+        refresh_stats_snapshot()
         serializer = self.get_serializer(match)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], permission_classes=[IsStats])
     def stats(self, request):
-        if request.user.username.strip() != 'stats':
-            raise PermissionDenied("API permission denied")
         num_matches = Match.objects.count()
         return Response({"num_matches": num_matches}, status=status.HTTP_200_OK)
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], permission_classes=[IsFront])
     def latest(self, request):
-        if request.user.username.strip() != 'front':
-            raise PermissionDenied("API permission denied")
         try:
-            latest_match = Match.objects.latest('creation_date')
-            serializer = self.get_serializer(latest_match)
-            data = serializer.data
-            data['vol_red'] = float(latest_match.vol_red)
-            data['vol_blue'] = float(latest_match.vol_blue)
-            return Response(serializer.data)
-        except Match.DoesNotExist:
-            return Response({'error': 'Aucun match trouvé'}, status=status.HTTP_404_NOT_FOUND)
+            m_id = read_through(
+                CURRENT_MATCH_KEY,
+                lambda: Match.objects.order_by('-creation_date').values_list('m_id', flat=True).first()
+            )
+            data = m_id and read_through(match_key(m_id), lambda: self.match_data(m_id))
+            if not data:
+                return Response({'error': 'Aucun match trouvé'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(data)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)            
 
+    def match_data(self, m_id):
+        row = Match.objects.filter(m_id=m_id).values(*MATCH_VALUES).first()
+        return match_values(row) if row else None
+
+    @action(detail=False, methods=['get'], permission_classes=[IsStats])
+    def cache_metrics(self, request):
+        return Response(read_cache_metrics())
+
+    @action(detail=False, methods=['get'], permission_classes=[IsStats])
+    def pool_metrics(self, request):
+        return Response(pool_metrics())
+
 class BetViewSet(BaseViewSet, mixins.UpdateModelMixin):
     queryset = Bet.objects.all()
     serializer_class = BetSerializer
+    filterset_class = BetFilter
     lookup_field = 'b_id'
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
 
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], permission_classes=[IsFront])
     @transaction.atomic
     def place_bet(self, request):
-        if request.user.username.strip() != 'front':
-            raise PermissionDenied("API permission denied")
         u_id = request.data.get('u_id')
         m_id = request.data.get('m_id')
         team = request.data.get('team')
@@ -546,11 +558,9 @@ class BetViewSet(BaseViewSet, mixins.UpdateModelMixin):
             print(f"Error creating bet: {str(e)}")
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    @action(detail=False, methods=['put'])
+    @action(detail=False, methods=['put'], permission_classes=[IsFront])
     @transaction.atomic
     def confirm_bet(self, request):
-        if request.user.username.strip() != 'front':
-            raise PermissionDenied("API permission denied")
         b_id = request.data.get('b_id')
         tx_in = request.data.get('tx_in')
         volume = request.data.get('volume')
@@ -558,11 +568,16 @@ class BetViewSet(BaseViewSet, mixins.UpdateModelMixin):
 
         try:
             bet = Bet.objects.select_for_update().get(b_id=b_id)
+            was_confirmed = bet.success_in
+            previous_volume = bet.volume if was_confirmed else 0
             
             bet.tx_in = tx_in
             bet.success_in = True
-            bet.volume = Decimal(str(volume))
+            bet.volume = to_lamports(volume)
             bet.save()
+            update_match_counters(bet.m_id_id, bet.team, bet.volume - previous_volume, 0 if was_confirmed else 1)
+            transaction.on_commit(lambda: invalidate_match(bet.m_id_id))
+            transaction.on_commit(lambda: schedule_volume_broadcast(bet.m_id_id))
             
             serializer = self.get_serializer(bet)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -570,19 +585,24 @@ class BetViewSet(BaseViewSet, mixins.UpdateModelMixin):
                 
         except Bet.DoesNotExist:
             return Response({'error': 'Bet not found'}, status=status.HTTP_404_NOT_FOUND)
+        except ValidationError as e:
+            return Response({'error': ' '.join(e.messages)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    @action(detail=False, methods=['delete'])
+    @action(detail=False, methods=['delete'], permission_classes=[IsFront])
     @transaction.atomic
     def cancel_bet(self, request):
-        if request.user.username.strip() != 'front':
-            raise PermissionDenied("API permission denied")
         b_id = request.query_params.get('b_id')
         
         try:
             bet = Bet.objects.select_for_update().get(b_id=b_id)
+            m_id = bet.m_id_id
             bet.delete()
+            if bet.success_in:
+                update_match_counters(m_id, bet.team, -bet.volume, -1)
+            transaction.on_commit(lambda: invalidate_match(m_id))
+            transaction.on_commit(lambda: schedule_volume_broadcast(m_id))
             return Response({'message': 'Pari annulé avec succès'}, status=status.HTTP_200_OK)
             
         except Bet.DoesNotExist:
@@ -591,52 +611,30 @@ class BetViewSet(BaseViewSet, mixins.UpdateModelMixin):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], permission_classes=[IsScrap])
     @transaction.atomic
     def bets_volume(self, request):
-        if request.user.username.strip() != 'scrap':
-            raise PermissionDenied("API permission denied")
         
         m_id = request.query_params.get('m_id')
         if not m_id:
             return Response({'error': 'm_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            match = Match.objects.select_for_update().get(m_id=m_id)
-            
-            volumes = Bet.objects.filter(
-                m_id=match,
-                success_in=True
-            ).values('team').annotate(
-                total_volume=Sum('volume')
-            )
-            
-            match.vol_red = 0
-            match.vol_blue = 0
-            
-            for volume in volumes:
-                if volume['team'] == 'red':
-                    match.vol_red = volume['total_volume'] or 0
-                elif volume['team'] == 'blue':
-                    match.vol_blue = volume['total_volume'] or 0
+            match = Match.objects.only('vol_red', 'vol_blue', 'nb_bet').get(m_id=m_id)
             
             is_invalid = (match.vol_red == 0 and match.vol_blue > 0) or (match.vol_red > 0 and match.vol_blue == 0)
             
-            if is_invalid:
-                Bet.objects.filter(m_id=match).update(invalid_match=True)
-            else:
-                Bet.objects.filter(m_id=match).update(invalid_match=False)
-            
-            match.save()
+            # Un seul UPDATE, sans réécrire les paris déjà marqués
+            Bet.objects.filter(m_id=match).exclude(invalid_match=is_invalid).update(invalid_match=is_invalid)
 
             return Response({
-                "total_red": float(match.vol_red),
-                "total_blue": float(match.vol_blue),
+                "total_red": to_sol(match.vol_red),
+                "total_blue": to_sol(match.vol_blue),
                 "debug_info": {
                     "is_invalid": is_invalid,
-                    "total_bets": Bet.objects.filter(m_id=match, success_in=True).count(),
-                    "total_red": float(match.vol_red),
-                    "total_blue": float(match.vol_blue)
+                    "total_bets": match.nb_bet,
+                    "total_red": to_sol(match.vol_red),
+                    "total_blue": to_sol(match.vol_blue)
                 }
             }, status=status.HTTP_200_OK)
             
@@ -645,68 +643,65 @@ class BetViewSet(BaseViewSet, mixins.UpdateModelMixin):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], permission_classes=[IsScrap])
     def get_volumes(self, request):
-        if request.user.username.strip() != 'scrap':
-            raise PermissionDenied("API permission denied")
         
         m_id = request.query_params.get('m_id')
         if not m_id:
             return Response({'error': 'm_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        try:
-            match = Match.objects.get(m_id=m_id)
-            volumes = Bet.objects.filter(
-                m_id=match,
-                success_in=True
-            ).values('team').annotate(
-                total_volume=Sum('volume')
-            )
-            
-            total_red = 0
-            total_blue = 0
-            
-            for volume in volumes:
-                if volume['team'] == 'red':
-                    total_red = volume['total_volume'] or 0
-                elif volume['team'] == 'blue':
-                    total_blue = volume['total_volume'] or 0
-
-            return Response({
-                "total_red": float(total_red),
-                "total_blue": float(total_blue),
-                "debug_info": {
-                    "total_bets": Bet.objects.filter(m_id=match, success_in=True).count()
-                }
-            })
-            
-        except Match.DoesNotExist:
+        data = read_through(match_volumes_key(m_id), lambda: self.volumes_data(m_id))
+        if data is None:
             return Response({'error': 'Match not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
+
+    def volumes_data(self, m_id):
+        row = Match.objects.filter(m_id=m_id).values(*VOLUMES_VALUES).first()
+        return volumes_values(row) if row else None
 
-    @action(detail=False, methods=['put'])
+    @action(detail=False, methods=['put'], permission_classes=[IsScrap])
     def bet_payout(self, request):
-        if request.user.username.strip() != 'scrap':
-            raise PermissionDenied("API permission denied")
         data = request.data
         if not data:
             raise ValidationError("No data provided")
         bets_processed = 0
         bets_not_found = []
+        touched_users = set()
         try:
+            bet_ids = []
             for bet_data in data:
                 bet_id = bet_data.get('bet_id')
                 if not bet_id:
                     raise ValidationError(f"Missing bet_id in data: {bet_data}")
                 try:
-                    bet = Bet.objects.get(b_id=bet_id)
-                    bet.payout = Decimal(str(bet_data['payout']))
+                    bet_ids.append(uuid.UUID(str(bet_id)))
+                except ValueError:
+                    raise ValidationError(f"Invalid bet_id in data: {bet_data}")
+                try:
+                    signature_bytes(bet_data.get('valid_hash'))
+                except ValidationError:
+                    raise ValidationError(f"Invalid valid_hash in data: {bet_data}")
+
+            with transaction.atomic():
+                bets = Bet.objects.in_bulk(bet_ids, field_name='b_id')
+                for bet_id, bet_data in zip(bet_ids, data):
+                    bet = bets.get(bet_id)
+                    if bet is None:
+                        bets_not_found.append(bet_data['bet_id'])
+                        continue
+                    bet.payout = to_lamports(bet_data['payout'])
                     bet.tx_out = bet_data['valid_hash']
                     bet.success_out = bool(bet_data['valid_hash'])
                     bet.invalid_match = bet_data['invalid_match']
-                    bet.save()
+                    touched_users.add(bet.u_id_id)
                     bets_processed += 1
-                except Bet.DoesNotExist:
-                    bets_not_found.append(bet_id)
+                Bet.objects.bulk_update(
+                    bets.values(),
+                    ['payout', 'tx_out', 'success_out', 'invalid_match'],
+                    batch_size=BULK_UPDATE_BATCH_SIZE
+                )
+                mark_totals_dirty(touched_users)
+            invalidate_user_stats(touched_users)
             return Response({
                 "message": f"{bets_processed} bet(s) processed successfully",
                 "bets_not_found": bets_not_found
@@ -717,36 +712,24 @@ class BetViewSet(BaseViewSet, mixins.UpdateModelMixin):
             return Response({'error': f"An unexpected error occurred: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
                 
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], permission_classes=[IsFront])
     def bet_history(self, request):
-        if request.user.username.strip() != 'front':
-            raise PermissionDenied("API permission denied")
         
         wallet = request.query_params.get('wallet')
         if not wallet:
             return Response({'error': 'wallet is required'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            user = User.objects.get(wallet=wallet)
             bets = Bet.objects.filter(
-                u_id=user,
+                u_id__wallet=wallet,
                 success_in=True
-                
-            ).order_by('-creation_date')[:10]
-
-            data = [{
-                'b_id': str(bet.b_id)[:4],  # Tronqué
-                'team': bet.team,
-                'volume': float(bet.volume),
-                'won': bet.payout > 0,
-                'payout': float(bet.payout) if bet.payout > 0 else None,
-                'invalid_match': bet.invalid_match,
-                'date': bet.creation_date
-            } for bet in bets]
-            
+            ).order_by('-creation_date').values(*BET_HISTORY_VALUES)[:10]
+            data = [bet_history_values(bet) for bet in bets]
+
+            # Le 404 n'est vérifié que lorsqu'il n'y a aucun pari
+            if not data and not User.objects.filter(wallet=wallet).exists():
+                return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
             return Response(data)
-        except User.DoesNotExist:
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -756,13 +739,14 @@ class BetViewSet(BaseViewSet, mixins.UpdateModelMixin):
 class FighterViewSet(BaseViewSet, mixins.UpdateModelMixin):
     queryset = Fighter.objects.all()
     serializer_class = FighterSerializer
+    filterset_class = FighterFilter
+    cursor_ordering = ('pk',)
     lookup_field = 'f_id'
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
+    values_fields = FIGHTER_VALUES
+    values_row = staticmethod(fighter_values)
+    action_permission_classes = {'create': [IsScrap]}
 
     def create(self, request):
-        if request.user.username.strip() != 'scrap':
-            raise PermissionDenied("API permission denied")
         fighter_name = request.data.get('name', '').replace(" ", "_")
         fighter, created = Fighter.objects.get_or_create(
             name=fighter_name,
@@ -776,10 +760,8 @@ class FighterViewSet(BaseViewSet, mixins.UpdateModelMixin):
         serializer = self.get_serializer(fighter)
         return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
  
-    @action(detail=False, methods=['put'])
+    @action(detail=False, methods=['put'], permission_classes=[IsScrap])
     def update_fighter(self, request):
-        if request.user.username.strip() != 'scrap':
-            raise PermissionDenied("API permission denied")
         fighter_id = request.data.get('f_id')
         win = request.data.get('win', False)
         fighter = get_object_or_404(Fighter, f_id=fighter_id)
@@ -796,10 +778,8 @@ class FighterViewSet(BaseViewSet, mixins.UpdateModelMixin):
         serializer = self.get_serializer(fighter)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-    @action(detail=False, methods=['put'])
+    @action(detail=False, methods=['put'], permission_classes=[IsScrap])
     def update_elo(self, request):
-        if request.user.username.strip() != 'scrap':
-            raise PermissionDenied("API permission denied")
         winner_id = request.data.get('winner_id')
         loser_id = request.data.get('loser_id')
         if not winner_id or not loser_id:
@@ -819,10 +799,8 @@ class FighterViewSet(BaseViewSet, mixins.UpdateModelMixin):
             "loser_elo": round(loser.elo, 2)
         }, status=status.HTTP_200_OK)
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], permission_classes=[IsStats])
     def stats(self, request):
-        if request.user.username.strip() != 'stats':
-            raise PermissionDenied("API permission denied")
         top_fighter = Fighter.objects.order_by('-elo').first()
         bottom_fighter = Fighter.objects.order_by('elo').first()
         num_fighters = Fighter.objects.count()
@@ -835,6 +813,14 @@ class FighterViewSet(BaseViewSet, mixins.UpdateModelMixin):
 class GlobalViewSet(BaseViewSet, mixins.UpdateModelMixin):
     queryset = Global.objects.all()
     serializer_class = GlobalSerializer
+    filterset_class = GlobalFilter
+    cursor_ordering = ('day', 'pk')
     lookup_field = 'g_id'
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
\ No newline at end of file
+
+    @action(detail=False, methods=['get'], permission_classes=[IsStats])
+    def snapshot(self, request):
+        snapshot = get_stats_snapshot()
+        headers = {'ETag': snapshot['etag']}
+        if request.headers.get('If-None-Match') == snapshot['etag']:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(snapshot['data'], status=status.HTTP_200_OK, headers=headers)
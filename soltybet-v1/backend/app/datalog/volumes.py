@@ -0,0 +1,76 @@
+import logging
+import threading
+import time
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Greatest
+from datalog.models import Match
+from datalog.serializers import to_sol
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = {}
+_last_sent = {}
+
+def update_match_counters(m_id, team, volume, nb_bet):
+    """Shift a match's confirmed volume for `team` and its bet count.
+
+    Runs inside the bet's transaction, so the counters commit (or roll back)
+    together with the confirmation or cancellation they reflect.
+    """
+    field = 'vol_red' if team == 'red' else 'vol_blue'
+    # Clamped so a match whose counters predate this bookkeeping cannot go negative
+    Match.objects.filter(m_id=m_id).update(**{
+        field: Greatest(F(field) + volume, 0),
+        'nb_bet': Greatest(F('nb_bet') + nb_bet, 0),
+    })
+
+def match_volumes(m_id):
+    """Return the confirmed (total_red, total_blue) volumes of a match."""
+    total_red, total_blue = Match.objects.values_list('vol_red', 'vol_blue').get(m_id=m_id)
+    return to_sol(total_red), to_sol(total_blue)
+
+def schedule_volume_broadcast(m_id):
+    """Push the match volumes to phase_group, at most once per VOLUME_BROADCAST_INTERVAL.
+
+    Calls made while a broadcast is already scheduled are coalesced into it:
+    the totals are read when the timer fires, so the last bet is never lost.
+    """
+    m_id = str(m_id)
+    with _lock:
+        if m_id in _pending:
+            return
+        elapsed = time.monotonic() - _last_sent.get(m_id, float('-inf'))
+        delay = max(0.0, settings.VOLUME_BROADCAST_INTERVAL - elapsed)
+        timer = threading.Timer(delay, _broadcast, args=(m_id,))
+        timer.daemon = True
+        _pending[m_id] = timer
+    timer.start()
+
+def _broadcast(m_id):
+    now = time.monotonic()
+    with _lock:
+        _pending.pop(m_id, None)
+        for key, sent in list(_last_sent.items()):
+            if now - sent > settings.VOLUME_BROADCAST_INTERVAL:
+                del _last_sent[key]
+        _last_sent[m_id] = now
+    try:
+        total_red, total_blue = match_volumes(m_id)
+        async_to_sync(get_channel_layer().group_send)(
+            "phase_group",
+            {
+                "type": "volume_message",
+                "m_id": m_id,
+                "total_red": total_red,
+                "total_blue": total_blue
+            }
+        )
+    except Exception as e:
+        logger.error(f"Volume broadcast failed for match {m_id}: {e}")
+    finally:
+        connection.close()
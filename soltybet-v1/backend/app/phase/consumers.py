@@ -1,7 +1,8 @@
-import json
+import functools
 import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.exceptions import DenyConnection
+from backend.encoders import dumps_str, loads
 
 logger = logging.getLogger(__name__)
 
@@ -13,12 +14,28 @@ current_state = {
     "total_red": "",
     "total_blue": ""
 }
+# current_state encoded once and shared by every consumer of the worker
+_current_state_text = None
+
+def current_state_text():
+    global _current_state_text
+    if _current_state_text is None:
+        _current_state_text = dumps_str(current_state)
+    return _current_state_text
+
+@functools.lru_cache(maxsize=16)
+def volume_text(state_text, total_red, total_blue):
+    # Consumers holding the same phase state share one encoding of each volume update
+    return dumps_str({**loads(state_text), "total_red": total_red, "total_blue": total_blue})
 
 class PhaseConsumer(AsyncWebsocketConsumer):
     async def connect(self):
+        # The match this consumer follows comes from the phase messages it
+        # receives, the worker's state only seeds it at connection
+        self.m_id, self.state_text = current_state["m_id"], current_state_text()
         await self.channel_layer.group_add("phase_group", self.channel_name)
         await self.accept()
-        await self.send(text_data=json.dumps(current_state))
+        await self.send(text_data=self.state_text)
 
     async def disconnect(self, close_code):
         try:
@@ -28,7 +45,7 @@ class PhaseConsumer(AsyncWebsocketConsumer):
 
     async def receive(self, text_data):
         try:
-            data = json.loads(text_data)
+            data = loads(text_data)
             message_type = data.get("type")
             if message_type == "phase":
                 message_text = data.get("text", "")
@@ -37,7 +54,7 @@ class PhaseConsumer(AsyncWebsocketConsumer):
                 m_id = data.get("m_id", "")
                 total_red = data.get("total_red", "")
                 total_blue = data.get("total_blue", "")
-                global current_state
+                global current_state, _current_state_text
                 current_state = {
                     "message": message_text,
                     "redFighter": red_fighter,
@@ -46,17 +63,15 @@ class PhaseConsumer(AsyncWebsocketConsumer):
                     "total_red": total_red,
                     "total_blue": total_blue
                 }
+                _current_state_text = None
 
+                # Encoded once here, every consumer forwards the same text
                 await self.channel_layer.group_send(
                     "phase_group",
                     {
                         "type": "phase_message",
-                        "message": message_text,
-                        "redFighter": red_fighter,
-                        "blueFighter": blue_fighter,
                         "m_id": m_id,
-                        "total_red": total_red,
-                        "total_blue": total_blue
+                        "text_data": current_state_text()
                     }
                 )
             elif message_type == "info":
@@ -67,8 +82,11 @@ class PhaseConsumer(AsyncWebsocketConsumer):
                     "phase_group",
                     {
                         "type": "info_message",
-                        "text": info_text,
-                        "m_id": m_id
+                        "text_data": dumps_str({
+                            "type": "info",
+                            "text": info_text,
+                            "m_id": m_id
+                        })
                     }
                 )
         except Exception as e:
@@ -76,33 +94,29 @@ class PhaseConsumer(AsyncWebsocketConsumer):
 
     async def phase_message(self, event):
         try:
-            message = event["message"]
-            red_fighter = event["redFighter"]
-            blue_fighter = event["blueFighter"]
-            m_id = event["m_id"]
-            total_red = event["total_red"]
-            total_blue = event["total_blue"]
-
-            await self.send(text_data=json.dumps({
-                "message": message,
-                "redFighter": red_fighter,
-                "blueFighter": blue_fighter,
-                "m_id": m_id,
-                "total_red": total_red,
-                "total_blue": total_blue
-            }))
+            self.m_id, self.state_text = event["m_id"], event["text_data"]
+            await self.send(text_data=self.state_text)
         except Exception as e:
             logger.error(f"Unexpected error: {e}")
     
-    async def info_message(self, event):
+    async def volume_message(self, event):
         try:
-            info_text = event["text"]
-            m_id = event["m_id"]
+            if event["m_id"] != self.m_id:
+                return
+            self.state_text = volume_text(self.state_text, event["total_red"], event["total_blue"])
+            global _current_state_text
+            # Keeps the totals sent to the next connections current
+            if current_state["m_id"] == event["m_id"] and (current_state["total_red"], current_state["total_blue"]) != (event["total_red"], event["total_blue"]):
+                current_state["total_red"] = event["total_red"]
+                current_state["total_blue"] = event["total_blue"]
+                _current_state_text = None
 
-            await self.send(text_data=json.dumps({
-                "type": "info",
-                "text": info_text,
-                "m_id": m_id
-            }))
+            await self.send(text_data=self.state_text)
+        except Exception as e:
+            logger.error(f"Unexpected error: {e}")
+
+    async def info_message(self, event):
+        try:
+            await self.send(text_data=event["text_data"])
         except Exception as e:
             logger.error(f"Unexpected error: {e}")
\ No newline at end of file
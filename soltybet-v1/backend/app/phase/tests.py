@@ -1,3 +1,54 @@
-from django.test import TestCase
+from unittest import mock
+from django.test import SimpleTestCase
+from backend.encoders import dumps_str, loads
+from phase import consumers
+from phase.consumers import PhaseConsumer
 
-# Create your tests here.
\ No newline at end of file
+def phase_event(m_id, total_red=0, total_blue=0):
+    state = {"message": "Bets are open", "redFighter": "red", "blueFighter": "blue",
+             "m_id": m_id, "total_red": total_red, "total_blue": total_blue}
+    return {"type": "phase_message", "m_id": m_id, "text_data": dumps_str(state)}
+
+def volume_event(m_id, total_red, total_blue):
+    return {"type": "volume_message", "m_id": m_id, "total_red": total_red, "total_blue": total_blue}
+
+class PhaseConsumerTest(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.multiple(consumers, current_state=dict(consumers.current_state), _current_state_text=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def consumer(self):
+        consumer = PhaseConsumer()
+        consumer.send = mock.AsyncMock()
+        return consumer
+
+    def sent(self, consumer):
+        return [loads(call.kwargs['text_data']) for call in consumer.send.await_args_list]
+
+    async def test_volumes_follow_the_consumer_match(self):
+        consumer = self.consumer()
+        await consumer.phase_message(phase_event('m1'))
+        await consumer.volume_message(volume_event('m1', 1.5, 2.0))
+        # The worker's state names another match: the consumer still filters on its own
+        consumers.current_state["m_id"] = 'm2'
+        await consumer.volume_message(volume_event('m1', 3.0, 2.0))
+        await consumer.volume_message(volume_event('m2', 9.0, 9.0))
+        frames = self.sent(consumer)
+        self.assertEqual([(frame["total_red"], frame["total_blue"]) for frame in frames], [(0, 0), (1.5, 2.0), (3.0, 2.0)])
+        self.assertTrue(all(frame["m_id"] == 'm1' and frame["redFighter"] == 'red' for frame in frames))
+
+    async def test_phase_message_switches_match(self):
+        consumer = self.consumer()
+        await consumer.phase_message(phase_event('m1'))
+        await consumer.phase_message(phase_event('m2'))
+        await consumer.volume_message(volume_event('m1', 1.0, 1.0))
+        await consumer.volume_message(volume_event('m2', 4.0, 0.5))
+        self.assertEqual([frame["total_red"] for frame in self.sent(consumer)], [0, 0, 4.0])
+
+    async def test_consumers_share_the_volume_frame(self):
+        first, second = self.consumer(), self.consumer()
+        for consumer in (first, second):
+            await consumer.phase_message(phase_event('m1'))
+            await consumer.volume_message(volume_event('m1', 1.0, 2.0))
+        self.assertIs(first.send.await_args.kwargs['text_data'], second.send.await_args.kwargs['text_data'])
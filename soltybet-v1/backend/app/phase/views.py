@@ -1,13 +1,13 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from datalog.authentication import ServiceTokenAuthentication
 from django.utils.crypto import get_random_string
 from django.core.cache import cache
 import uuid
 
 class WSTokenView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ServiceTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -27,8 +27,11 @@ done
 # Migrate everything to the database
 echo -e "\n========== Migrating database ==========\n"
 
-python manage.py makemigrations
-python manage.py migrate
+# The schema and its data conversions are in the committed migrations: never start on a half-migrated database
+python manage.py migrate || exit 1
+
+# Sorted-set leaderboards are derived from Postgres; reload them on every start
+python manage.py rebuild_leaderboards
 
 
 # Create a superuser with a random password
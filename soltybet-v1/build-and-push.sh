@@ -15,13 +15,20 @@ cd ..
 
 # Build and push scraper
 cd scraper
-docker build -t localhost:5742/scraper:0.0.1 .
+# chat_events.py is shared with the oracle and comes from the ingest service
+docker build --build-context ingest=../ingest -t localhost:5742/scraper:0.0.1 .
 docker push localhost:5742/scraper:0.0.1
 cd ..
 
+# Build and push ingest
+cd ingest
+docker build -t localhost:5742/ingest:0.0.1 .
+docker push localhost:5742/ingest:0.0.1
+cd ..
+
 # Build and push oracle
 cd oracle
-docker build -t localhost:5742/oracle:0.0.1 .
+docker build --build-context ingest=../ingest -t localhost:5742/oracle:0.0.1 .
 docker push localhost:5742/oracle:0.0.1
 cd ..
 
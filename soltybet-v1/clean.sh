@@ -4,5 +4,6 @@ docker service rm soltybet_pgadmin
 docker service rm soltybet_db
 docker service rm soltybet_redis
 docker service rm soltybet_scraper
+docker service rm soltybet_ingest
 docker service rm soltybet_grafana
 docker service rm soltybet_oracle
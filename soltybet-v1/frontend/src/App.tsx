@@ -36,6 +36,7 @@ const AppContent: React.FC = () => {
   const wallet = useWallet();
 
   useEffect(() => {
+    tokenManager.setSessionKey(wallet.connected && wallet.publicKey ? wallet.publicKey.toString() : null);
     const createOrGetUserData = async () => {
       if (wallet.connected && wallet.publicKey) {
         try {
@@ -34,6 +34,10 @@ const createTokenManager = () => {
   let encryptedJwtRefreshToken: string | null = null;
   let cachedJwtToken: string | null = null;
   let tokenPromise: Promise<string> | null = null;
+  // Read-your-writes session of this client (see backend/db_router.py): every
+  // browser shares the front token, so the backend pins on this key as well
+  const tabSessionKey = crypto.randomUUID();
+  let sessionKey = tabSessionKey;
 
   const ENCRYPTION_KEY = import.meta.env.VITE_REACT_APP_ENCRYPTION_KEY;
 
@@ -69,7 +73,8 @@ const createTokenManager = () => {
       baseURL: 'https://solty.bet/api',
       headers: {
         'Content-Type': 'application/json',
-        'Authorization': `Bearer ${jwtToken}`
+        'Authorization': `Bearer ${jwtToken}`,
+        'X-Session-Key': sessionKey
       },
     });
 
@@ -156,6 +161,10 @@ const createTokenManager = () => {
 
     isAuthenticated: (): boolean => isAuthenticated,
 
+    setSessionKey: (wallet: string | null): void => {
+      sessionKey = wallet ?? tabSessionKey;
+    },
+
     getData: async <T>(url: string, params?: Record<string, any>): Promise<T> => {
       if (!isAuthenticated) {
         await tokenManager.getToken();
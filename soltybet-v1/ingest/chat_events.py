@@ -0,0 +1,31 @@
+"""Client side of the phase event stream served by main.py.
+
+The oracle and scraper images copy this module from the ingest build
+context (see build-and-push.sh), so the protocol has a single definition.
+"""
+import asyncio
+import json
+import logging
+import os
+import websockets
+
+CHAT_EVENTS_URL = os.environ.get('CHAT_EVENTS_URL', 'ws://ingest:8765')
+
+logger = logging.getLogger(__name__)
+
+async def subscribe(url=CHAT_EVENTS_URL):
+    """Yield the phase events published by the ingest service, reconnecting forever."""
+    stream, last_seq = None, None
+    while True:
+        try:
+            async with websockets.connect(url) as websocket:
+                logger.info(f"Subscribed to phase events at {url}")
+                async for raw in websocket:
+                    event = json.loads(raw)
+                    if event["stream"] == stream and event["seq"] != last_seq + 1:
+                        logger.warning(f"Missed {event['seq'] - last_seq - 1} phase event(s)")
+                    stream, last_seq = event["stream"], event["seq"]
+                    yield event
+        except (OSError, websockets.exceptions.WebSocketException) as e:
+            logger.warning(f"Phase event subscription lost: {e}. Reconnecting in 5 seconds...")
+            await asyncio.sleep(5)
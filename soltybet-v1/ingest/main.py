@@ -0,0 +1,94 @@
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+import websockets
+from websockets.asyncio.server import serve, broadcast
+
+TWITCH_WS_URL = 'wss://irc-ws.chat.twitch.tv:443'
+NICK = 'justinfan12345'
+TARGET_ROOM_ID = '43201452'
+TARGET_USER_ID = '55853880'
+CHANNEL_NAME = 'saltybet'
+HOST = os.environ.get('INGEST_HOST', '0.0.0.0')
+PORT = int(os.environ.get('INGEST_PORT', '8765'))
+
+PHASES = (
+    ("Bets are OPEN", "open"),
+    ("Bets are locked", "locked"),
+    ("wins!", "wins"),
+)
+
+subscribers = set()
+stream_id = str(uuid.uuid4())
+sequence = 0
+
+def classify(msg):
+    for marker, phase in PHASES:
+        if marker in msg:
+            return phase
+    return None
+
+def publish(phase, text):
+    """Send one phase event to every subscriber.
+
+    Events carry the ingest-side receive time so the oracle and the scraper
+    share one clock, and a sequence number scoped to `stream` (one per
+    process start) so subscribers can detect lost events.
+    """
+    global sequence
+    sequence += 1
+    event = {
+        "stream": stream_id,
+        "seq": sequence,
+        "ts": time.time(),
+        "phase": phase,
+        "text": text
+    }
+    print(f"Publishing to {len(subscribers)} subscriber(s): {event}")
+    broadcast(subscribers, json.dumps(event))
+
+async def handle_subscriber(websocket):
+    subscribers.add(websocket)
+    try:
+        await websocket.wait_closed()
+    finally:
+        subscribers.discard(websocket)
+
+async def twitch_chat_listener():
+    while True:
+        try:
+            async with websockets.connect(TWITCH_WS_URL) as websocket:
+                await websocket.send(f'NICK {NICK}')
+                await websocket.send(f'CAP REQ :twitch.tv/tags twitch.tv/commands')
+                await websocket.send(f'JOIN #{CHANNEL_NAME}')
+                print(f"Joining channel: #{CHANNEL_NAME}")
+
+                async for message in websocket:
+                    if message.startswith('PING'):
+                        await websocket.send('PONG :tmi.twitch.tv')
+                    elif 'PRIVMSG' in message:
+                        user_id = re.search(r'user-id=(\d+)', message)
+                        room_id = re.search(r'room-id=(\d+)', message)
+                        msg = re.search(r'PRIVMSG #\S+ :(.*)', message)
+                        if not (user_id and room_id and msg):
+                            continue
+                        if user_id.group(1) != TARGET_USER_ID or room_id.group(1) != TARGET_ROOM_ID:
+                            continue
+                        msg = msg.group(1).strip()
+                        phase = classify(msg)
+                        if phase:
+                            publish(phase, msg)
+        except (OSError, websockets.exceptions.WebSocketException) as e:
+            print(f"Twitch connection error: {e}. Reconnecting in 5 seconds...")
+            await asyncio.sleep(5)
+
+async def main():
+    async with serve(handle_subscriber, HOST, PORT):
+        print(f"Serving phase events on ws://{HOST}:{PORT}")
+        await twitch_chat_listener()
+
+if __name__ == "__main__":
+    asyncio.run(main())
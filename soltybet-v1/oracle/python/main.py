@@ -1,13 +1,11 @@
 import asyncio
-import websockets
-import re
-import logging
 from compute import compute_bets, compute_payouts
-from utils import load_bets, determine_winning_team, is_invalid_match, save_match_history, save_last_match, get_current_block_id
+from utils import load_bets, determine_winning_team, is_invalid_match, save_match_history, save_last_match, get_block_id_at
 from payouts import process_payouts
 from gate import set_gate_state
 from config import load_config, logger
 from message import send_to_discord
+from chat_events import subscribe
 import subprocess
 import pandas as pd
 
@@ -24,67 +22,28 @@ class MatchContext:
 		self.config = load_config()
 		self.block_ids = [None, None]
 
-TWITCH_WS_URL = 'wss://irc-ws.chat.twitch.tv:443'
-NICK = 'justinfan12345'
-TARGET_ROOM_ID = '43201452'
-TARGET_USER_ID = '55853880'
-CHANNEL_NAME = 'saltybet'
+async def phase_listener(context: MatchContext):
+	"""Drive the match phases from the events of the shared ingest service."""
+	sync_time = False
+	async for event in subscribe():
+		logger.debug(f"Phase event #{event['seq']}: {event['text']}")
+		sync_time = await handle_phase(event["text"], event["ts"], context, sync_time)
 
-async def twitch_chat_listener(context: MatchContext):
-	while True:
-		try:
-			async with websockets.connect(TWITCH_WS_URL) as websocket:
-				await websocket.send(f'NICK {NICK}')
-				await websocket.send(f'CAP REQ :twitch.tv/tags twitch.tv/commands')
-				await websocket.send(f'JOIN #{CHANNEL_NAME}')
-
-				logger.debug(f"Joining channel: #{CHANNEL_NAME}")
-				sync_time = False
-				while True:
-					try:
-						message = await websocket.recv()
-						if message.startswith('PING'):
-							await websocket.send('PONG :tmi.twitch.tv')
-						elif 'PRIVMSG' in message:
-							username = re.search(r'display-name=([^;]+)', message)
-							user_id = re.search(r'user-id=(\d+)', message)
-							room_id = re.search(r'room-id=(\d+)', message)
-							msg = re.search(r'PRIVMSG #\S+ :(.*)', message)
-							if username and user_id and room_id and msg:
-								username = username.group(1)
-								user_id = user_id.group(1)
-								room_id = room_id.group(1)
-								msg = msg.group(1)
-								if user_id == TARGET_USER_ID and room_id == TARGET_ROOM_ID:
-									logger.debug(f"Target message: {username}: {msg}")
-									sync_time = await handle_phase(msg, context, sync_time)
-					except asyncio.exceptions.IncompleteReadError:
-						logging.warning("IncompleteReadError occurred. Reconnecting...")
-						send_to_discord("IncompleteReadError occurred. Reconnecting...")
-						break
-					except websockets.exceptions.ConnectionClosedError:
-						logging.warning("IncompleteReadError occurred. Reconnecting...")
-						send_to_discord("ConnectionClosedError occurred. Reconnecting...")
-						break
-		except Exception as e:
-			logging.error(f"An error occurred: {e}. Attempting to reconnect in 5 seconds...")
-			await asyncio.sleep(5)
-
-async def handle_phase(phase_text: str, context: MatchContext, sync_time: bool):
-	"""Handle the current phase of the match."""
+async def handle_phase(phase_text: str, event_ts: float, context: MatchContext, sync_time: bool):
+	"""Handle the current phase of the match; `event_ts` is the ingest receive time, shared with the scraper."""
 	if "Bets are OPEN" in phase_text:
 		sync_time = True
-		await handle_bets_open(context)
+		await handle_bets_open(context, event_ts)
 		context.current_phase = "Bets are OPEN!"
 	elif "Bets are locked" in phase_text and sync_time:
-		await handle_bets_locked(context)
+		await handle_bets_locked(context, event_ts)
 		context.current_phase = "Bets are locked"
 	elif "wins!" in phase_text and sync_time:
 		await handle_match_over(phase_text, context)
 		context.current_phase = "wins!"
 	return sync_time
 
-async def handle_bets_open(context: MatchContext):
+async def handle_bets_open(context: MatchContext, event_ts: float):
 	"""Handle the bets open phase."""
 	try:
 		if context.bets_df is not None and not context.bets_df.empty:
@@ -101,13 +60,14 @@ async def handle_bets_open(context: MatchContext):
 	finally:
 		context.bets_df = None
 		context.invalid_match = False
-		context.block_ids[0] = get_current_block_id()
+		# The window opens when the chat announced it, not once the refunds above are done
+		context.block_ids[0] = get_block_id_at(event_ts)
 		set_gate_state("open", context.config)
 
-async def handle_bets_locked(context: MatchContext):
+async def handle_bets_locked(context: MatchContext, event_ts: float):
 	"""Handle the bets locked phase."""
 	set_gate_state("close", context.config)
-	context.block_ids[1] = get_current_block_id() + 5
+	context.block_ids[1] = get_block_id_at(event_ts) + 5
 	context.bets_df = load_bets(context.block_ids[0], context.block_ids[1])
 	if context.bets_df is None or context.bets_df.empty:
 		context.bets_df = None
@@ -151,7 +111,7 @@ async def main():
 	while True:
 		try:
 			context = MatchContext()
-			await twitch_chat_listener(context)
+			await phase_listener(context)
 		except Exception as e:
 			send_to_discord(f"main: Critical error: {e}")
 			logger.error("Critical error: %s", e)
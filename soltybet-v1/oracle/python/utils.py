@@ -22,6 +22,17 @@ def get_current_block_id():
 	logger.error("Failed to get current block ID after all retries")
 	return None
 
+# Target Solana slot time
+SLOT_DURATION = 0.4
+
+def get_block_id_at(timestamp: float):
+	"""Estimate the block id at `timestamp` (epoch seconds) by walking back from the current one."""
+	current = get_current_block_id()
+	if current is None:
+		return None
+	elapsed = max(0.0, time.time() - timestamp)
+	return current - int(elapsed / SLOT_DURATION)
+
 def load_bets(open_timestamp: int, close_timestamp: int) -> pd.DataFrame:
 	"""Load bets from the blockchain within the given timestamps."""
 	try:
@@ -1,26 +1,13 @@
 import requests
+import threading
 from datetime import datetime, timedelta
 from time import sleep
 from message import send_to_discord
 import logging
 
-def initialize_token(user, secret_file):
-	token_data = None
-	token_expiry = None
-	while not token_data:
-		token_data = get_access_token(user, secret_file)
-		if token_data:
-			token_expiry = datetime.now() + timedelta(minutes=15)
-			print(f"Token expiry set to: {token_expiry}, user={user}")
-		else:
-			send_to_discord("initialize_token: Failed to obtain token. Retrying in 20 seconds.")
-			sleep(20)
-	headers = {
-		'Authorization': f'Bearer {token_data["access"]}',
-		'Content-Type': 'application/json',
-		'Content-Security-Policy': "default-src 'self'; script-src 'self'; style-src 'self'; img-src 'self' data:; font-src 'self'"
-		}
-	return token_data, token_expiry, headers
+ACCESS_LIFETIME = timedelta(minutes=15)
+REFRESH_MARGIN = timedelta(minutes=5)
+RETRY_DELAY = 20
 
 def get_access_token(user, secret_file):
 	try:
@@ -57,31 +44,87 @@ def refresh_token(refresh_token):
 		send_to_discord(f"refresh_token: Unexpected error: {e}")
 	return None
 
-def check_and_refresh_token(token_data, token_expiry, headers, user, secret_file):
-	current_time = datetime.now()
-	if token_expiry is None or current_time >= token_expiry - timedelta(minutes=5):
-		try:
-			if token_data and token_data.get('refresh'):
-				print("Attempting to refresh token")
-				token_data = refresh_token(token_data['refresh'])
-				if token_data:
-					print("Token refreshed successfully")
-					token_expiry = datetime.now() + timedelta(minutes=15)
-				else:
-					send_to_discord("check_and_refresh_token: Token refresh failed")
+def build_headers(access):
+	return {
+		'Authorization': f'Bearer {access}',
+		'Content-Type': 'application/json',
+		'Content-Security-Policy': "default-src 'self'; script-src 'self'; style-src 'self'; img-src 'self' data:; font-src 'self'"
+		}
+
+class TokenProvider:
+	"""Keeps a service account token fresh from a background thread.
+
+	`headers` never does I/O: the refresher thread renews the token
+	`margin` before it expires, and concurrent `refresh()` calls collapse
+	into a single request to the backend.
+	"""
+
+	def __init__(self, user, secret_file, lifetime=ACCESS_LIFETIME, margin=REFRESH_MARGIN):
+		self.user = user
+		self.secret_file = secret_file
+		self.lifetime = lifetime
+		self.margin = margin
+		self._lock = threading.Lock()
+		self._stop = threading.Event()
+		self._generation = 0
+		self._token_data = None
+		self._expiry = None
+		self._headers = None
+		self._thread = None
+
+	@property
+	def headers(self):
+		return self._headers
+
+	@property
+	def expiry(self):
+		return self._expiry
+
+	def start(self):
+		"""Block until a first token is obtained, then start the refresher."""
+		while not self.refresh():
+			send_to_discord(f"TokenProvider: Failed to obtain token for {self.user}. Retrying in {RETRY_DELAY} seconds.")
+			sleep(RETRY_DELAY)
+		print(f"Token expiry set to: {self._expiry}, user={self.user}")
+		self._thread = threading.Thread(target=self._run, name=f"token-{self.user}", daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self):
+		self._stop.set()
+
+	def refresh(self):
+		"""Renew the token now. Returns True when a valid token is held.
+
+		A caller that had to wait for another refresh in progress reuses its
+		result instead of issuing a second request.
+		"""
+		generation = self._generation
+		with self._lock:
+			if generation != self._generation:
+				return self._headers is not None
+			token_data = None
+			if self._token_data and self._token_data.get('refresh'):
+				token_data = refresh_token(self._token_data['refresh'])
 			if not token_data:
-				token_data, token_expiry, headers = initialize_token(user, secret_file)
-			else:
-				headers = {
-					'Authorization': f'Bearer {token_data["access"]}',
-					'Content-Type': 'application/json',
-					'Content-Security-Policy': "default-src 'self'; script-src 'self'; style-src 'self'; img-src 'self' data:; font-src 'self'"
-				}
+				token_data = get_access_token(self.user, self.secret_file)
 			if not token_data:
-				raise Exception('Failed to obtain new token')
-		except Exception as e:
-			error_msg = f"Error refreshing/reinitializing token: {str(e)}"
-			logging.error(error_msg)
-			send_to_discord(error_msg)
-			raise
-	return token_data, token_expiry, headers
\ No newline at end of file
+				return False
+			self._token_data = token_data
+			self._expiry = datetime.now() + self.lifetime
+			self._headers = build_headers(token_data['access'])
+			self._generation += 1
+			return True
+
+	def _run(self):
+		while not self._stop.is_set():
+			delay = (self._expiry - self.margin - datetime.now()).total_seconds()
+			if self._stop.wait(max(delay, 0)):
+				return
+			try:
+				if self.refresh():
+					continue
+				send_to_discord(f"TokenProvider: Token refresh failed for {self.user}")
+			except Exception as e:
+				logging.error(f"Error refreshing token for {self.user}: {e}")
+			self._stop.wait(RETRY_DELAY)
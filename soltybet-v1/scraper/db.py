@@ -58,6 +58,16 @@ def handle_bets_open(red_fighter, blue_fighter, headers):
 		send_to_discord(f" {json.dumps(message, indent=4)} {e}")
 		return None, None, None
 
+def get_volumes(headers, match):
+    try:
+        response = requests.get(f'http://backend:8000/api/bets/get_volumes/?m_id={match["m_id"]}', headers=headers)
+        response.raise_for_status()
+        data = response.json()
+        return data['total_red'], data['total_blue']
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching volumes: {e}")
+        return 0, 0
+
 def handle_bets_locked(headers, match):
     try:
         m_id = match["m_id"]
@@ -77,8 +87,8 @@ def handle_bets_locked(headers, match):
         print(f"Error fetching bets volume: {e}")
         return 0, 0
 
-def handle_wins(phase, fighter_red, fighter_blue, current_time, match, headers):
-	duration = datetime.now() - current_time
+def handle_wins(phase, fighter_red, fighter_blue, current_time, match, headers, end_time=None):
+	duration = (end_time or datetime.now()) - current_time
 	duration_str = f"{duration.total_seconds() // 3600:02.0f}:{(duration.total_seconds() % 3600) // 60:02.0f}:{duration.total_seconds() % 60:02.0f}"
 	winner, _, _ = phase["text"].partition("wins!")
 	winner = winner.strip()
@@ -202,7 +212,7 @@ def handle_match_history(file_path, headers):
 			response.raise_for_status()
 			print("Bet payout processed successfully")
 			response = requests.put('http://backend:8000/api/users/user_totals/',
-									headers=headers)
+									params={'incremental': 'true'}, headers=headers)
 			response.raise_for_status()
 			print("User totals updated successfully")
 		except json.JSONDecodeError as e:
@@ -4,7 +4,7 @@ import asyncio
 import json
 from discord.ext import tasks
 from message import send_to_discord
-from auth_token import initialize_token, check_and_refresh_token
+from auth_token import TokenProvider
 from dotenv import load_dotenv
 from time import sleep
 
@@ -29,43 +29,58 @@ intents = discord.Intents.default()
 client = discord.Client(intents=intents)
 user = 'stats'
 secret_file = 'stats_pass'
+tokens = None
 
 @client.event
 async def on_ready():
     print(f'Logged in as {client.user}')
-    global token_data, token_expiry, headers
-    token_data, token_expiry, headers = initialize_token(user, secret_file)  # Initialize the token
+    global tokens
+    if tokens is None:
+        tokens = TokenProvider(user, secret_file).start()  # Refreshed in the background from now on
     print(f'Bot is ready, starting the loop')
-    update_channel_names.start()  # Start the loop when the bot is ready
+    if not update_channel_names.is_running():
+        update_channel_names.start()  # Start the loop when the bot is ready
+
+session = requests.Session()
+snapshot_etag = None
+channel_names = {}
+
+async def rename_channel(channel_id, name):
+    # Discord rate-limits channel edits: only rename when the value changed
+    if channel_names.get(channel_id) == name:
+        return
+    channel = client.get_channel(channel_id)
+    await channel.edit(name=name)
+    channel_names[channel_id] = name
 
 @tasks.loop(seconds=60)  # Set the interval to 60 seconds (1 minute)
 async def update_channel_names():
     try:
-        global token_data, token_expiry, headers
-        token_data, token_expiry, headers = check_and_refresh_token(token_data, token_expiry, headers, user, secret_file)
+        global snapshot_etag
+        headers = dict(tokens.headers)
+        if snapshot_etag:
+            headers['If-None-Match'] = snapshot_etag
+        response = session.get('http://backend:8000/api/stats/snapshot/', headers=headers)
+        if response.status_code == 304:
+            return
+        response.raise_for_status()
+        stats = response.json()
+        print(f'stats: {stats}')
 
-        match_stats = requests.get('http://backend:8000/api/matches/stats/', headers=headers).json()
-        fighter_stats = requests.get('http://backend:8000/api/fighters/stats/', headers=headers).json()
-        print(f'match_stats: {match_stats}')
-        print(f'fighter_stats: {fighter_stats}')
-        
-        channel = client.get_channel(MATCH_ID)
-        await channel.edit(name=f'Matches - {match_stats["num_matches"]}')
-        channel = client.get_channel(FIGHTER_ID)
-        await channel.edit(name=f'Fighters - {fighter_stats["num_fighters"]}')
+        await rename_channel(MATCH_ID, f'Matches - {stats["num_matches"]}')
+        await rename_channel(FIGHTER_ID, f'Fighters - {stats["num_fighters"]}')
         
         default_name = "No Fighter"
         default_elo = 1000.0
-        top_fighter = fighter_stats.get("top_fighter", {})
+        top_fighter = stats.get("top_fighter") or {}
         top_fighter_name = top_fighter.get("name", default_name)
         top_fighter_elo = float(top_fighter.get("elo", default_elo))
-        channel = client.get_channel(WINNER_ID)
-        await channel.edit(name=f'🐐 {top_fighter_name.replace("_", " ")} - {top_fighter_elo:.2f}')
-        bottom_fighter = fighter_stats.get("bottom_fighter", {})
+        await rename_channel(WINNER_ID, f'🐐 {top_fighter_name.replace("_", " ")} - {top_fighter_elo:.2f}')
+        bottom_fighter = stats.get("bottom_fighter") or {}
         bottom_fighter_name = bottom_fighter.get("name", default_name)
         bottom_fighter_elo = float(bottom_fighter.get("elo", default_elo))
-        channel = client.get_channel(LOSERS_ID)
-        await channel.edit(name=f'💀 {bottom_fighter_name.replace("_", " ")} - {bottom_fighter_elo:.2f}')
+        await rename_channel(LOSERS_ID, f'💀 {bottom_fighter_name.replace("_", " ")} - {bottom_fighter_elo:.2f}')
+        snapshot_etag = response.headers.get('ETag')
     except Exception as e:
         send_to_discord(f'Stats update failed: {e}')
 